@@ -2,8 +2,64 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# sqlite pragmas are applied to every new connection; pool settings apply to pooled engines (Postgres, file sqlite)
+ENGINE_PROFILES = {
+    "default": {
+        "journal_mode": "WAL", "busy_timeout": 5000, "synchronous": "NORMAL", "cache_size": -65536,
+        "mmap_size": 268435456, "temp_store": "MEMORY",
+        "pool_size": 10, "max_overflow": 30, "pool_recycle": 1800,
+    },
+    "durable": {
+        "journal_mode": "WAL", "busy_timeout": 10000, "synchronous": "FULL", "cache_size": -16384,
+        "mmap_size": 0, "temp_store": "DEFAULT",
+        "pool_size": 5, "max_overflow": 10, "pool_recycle": 1800,
+    },
+    "bulk": {
+        "journal_mode": "WAL", "busy_timeout": 30000, "synchronous": "OFF", "cache_size": -262144,
+        "mmap_size": 1073741824, "temp_store": "MEMORY",
+        "pool_size": 4, "max_overflow": 4, "pool_recycle": 3600,
+    },
+}
+
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./access_review.db")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "no-reply@example.com")
+    CYCLE_JOB_CHUNK_SIZE: int = int(os.getenv("CYCLE_JOB_CHUNK_SIZE", "5000"))
+    CYCLE_JOB_STALE_SECONDS: int = int(os.getenv("CYCLE_JOB_STALE_SECONDS", "300"))
+    CYCLE_JOB_IN_PROCESS: bool = os.getenv("CYCLE_JOB_IN_PROCESS", "true").lower() == "true"
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+    APPLY_CHUNK_SIZE: int = int(os.getenv("APPLY_CHUNK_SIZE", "1000"))
+    # debug: per-request SQL counts and timings as response headers
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    # per-route and per-block SQL statement budgets: off, log (default with DEBUG) or raise (tests)
+    QUERY_BUDGET: str = os.getenv("QUERY_BUDGET", "log" if DEBUG else "off").lower()
+    DB_PROFILE: str = os.getenv("DB_PROFILE", "default")
+    # "sync" or "async": which session the async read routes run on
+    DB_MODE: str = os.getenv("DB_MODE", "sync")
+    DIGEST_WINDOW_SECONDS: int = int(os.getenv("DIGEST_WINDOW_SECONDS", "3600"))
+    INBOX_URL: str = os.getenv("INBOX_URL", "http://localhost:8000/review/inbox?user_id={user_id}&cycle_id={cycle_id}")
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "localhost")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "1025"))
+    SMTP_USER: str = os.getenv("SMTP_USER", "")
+    SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "4"))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_BACKOFF_SECONDS: int = int(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+    OUTBOX_CLAIM_SECONDS: int = int(os.getenv("OUTBOX_CLAIM_SECONDS", "300"))
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "./exports")
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+    # session tokens: HMAC key (set it in production and share it across workers; a random
+    # per-process key is used otherwise), lifetime, how often other processes' revocations
+    # are picked up, and whether review routes reject requests without a token
+    AUTH_SECRET: str = os.getenv("AUTH_SECRET", "")
+    AUTH_TOKEN_TTL_SECONDS: int = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", "900"))
+    AUTH_REVOCATION_REFRESH_SECONDS: int = int(os.getenv("AUTH_REVOCATION_REFRESH_SECONDS", "15"))
+    AUTH_REQUIRED: bool = os.getenv("AUTH_REQUIRED", "false").lower() == "true"
+    RESOLVER_TTL_SECONDS: int = int(os.getenv("RESOLVER_TTL_SECONDS", "300"))
+    # catalog list bodies (roles, applications, mappings); bounds staleness from other processes
+    CATALOG_CACHE_TTL_SECONDS: int = int(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60"))
 
 settings = Settings()
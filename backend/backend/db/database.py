@@ -1,22 +1,101 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
-from backend.config import settings
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from backend.config import settings, ENGINE_PROFILES
+from backend.utils import metrics
+
+if settings.DB_PROFILE not in ENGINE_PROFILES:
+    raise ValueError(f"DB_PROFILE must be one of {', '.join(ENGINE_PROFILES)}")
+profile = ENGINE_PROFILES[settings.DB_PROFILE]
+
+SQLITE_PRAGMAS = ("journal_mode", "busy_timeout", "synchronous", "cache_size", "mmap_size", "temp_store")
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_recycle")
+
+is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+
+def _engine_options(url: str) -> dict:
+    # in-memory sqlite uses a singleton pool that takes no sizing
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+aiosqlite:")):
+        return {}
+    return {name: profile[name] for name in POOL_OPTIONS}
+
+def _apply_pragmas(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    for name in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {name}={profile[name]}")
+    cursor.close()
 
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
+    connect_args={"check_same_thread": False} if is_sqlite else {},
+    **_engine_options(settings.DATABASE_URL),
 )
 
-if settings.DATABASE_URL.startswith("sqlite"):
-    with engine.connect() as conn:
-        conn.execute(text("PRAGMA journal_mode=WAL;"))
+if is_sqlite:
+    event.listen(engine, "connect", _apply_pragmas)
+metrics.instrument(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# INSERT constructs with ON CONFLICT, by dialect name
+UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def upsert(db, table):
+    return UPSERTS[db.get_bind().dialect.name](table)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+def async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    async_engine = create_async_engine(async_url(settings.DATABASE_URL), **_engine_options(settings.DATABASE_URL))
+    if is_sqlite:
+        event.listen(async_engine.sync_engine, "connect", _apply_pragmas)
+    metrics.instrument(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def get_read_db():
+    # DB_MODE=async: an AsyncSession; sync: a regular Session driven through the threadpool by execute()
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def execute(db, stmt):
+    if isinstance(db, Session):
+        return await run_in_threadpool(lambda: db.execute(stmt).freeze()())
+    return await db.execute(stmt)
+
+def describe_profile() -> dict:
+    info = {
+        "profile": settings.DB_PROFILE,
+        "dialect": engine.dialect.name,
+        "db_mode": settings.DB_MODE,
+        "settings": profile,
+        "pool": engine.pool.status(),
+    }
+    if is_sqlite:
+        # read back from a pooled connection, so this shows what connections actually run with
+        with engine.connect() as conn:
+            info["applied"] = {name: conn.execute(text(f"PRAGMA {name}")).scalar() for name in SQLITE_PRAGMAS}
+    return info
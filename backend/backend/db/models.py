@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Boolean, Text, UniqueConstraint
+    Column, Integer, String, ForeignKey, DateTime, Boolean, Text, UniqueConstraint, Index, func, literal_column
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -41,6 +41,8 @@ class Application(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, unique=True)
     description = Column(String, nullable=True)
+    # comma-separated review stages for this application's items; NULL is the default pipeline
+    stage_order = Column(String, nullable=True)
 
     accesses = relationship("Access", back_populates="application", cascade="all, delete-orphan")
     managers = relationship("AppManagerMap", back_populates="application", cascade="all, delete-orphan")
@@ -53,6 +55,7 @@ class AppManagerMap(Base):
     id = Column(Integer, primary_key=True)
     app_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
     application = relationship("Application", back_populates="managers")
 
 
@@ -61,6 +64,7 @@ class AppOwnerMap(Base):
     id = Column(Integer, primary_key=True)
     app_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
     application = relationship("Application", back_populates="owners")
 
 
@@ -69,6 +73,7 @@ class BusinessOwnerMap(Base):
     id = Column(Integer, primary_key=True)
     app_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
     application = relationship("Application", back_populates="bos")
 
 
@@ -77,7 +82,26 @@ class ReportingMap(Base):
     id = Column(Integer, primary_key=True)
     manager_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    __table_args__ = (UniqueConstraint("manager_id", "user_id", name="_manager_user_uc"),)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        UniqueConstraint("manager_id", "user_id", name="_manager_user_uc"),
+        # a user's first row is their manager
+        Index("ix_reporting_map_user", "user_id", "id"),
+    )
+
+
+class ReportingClosure(Base):
+    # every (manager, report) pair in the reporting hierarchy, direct reports at depth 1,
+    # maintained from reporting_map by utils.reporting_closure
+    __tablename__ = "reporting_closure"
+    ancestor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_reporting_closure_descendant", "descendant_id", "depth"),
+        {"sqlite_with_rowid": False},
+    )
 
 
 class ReportingAppMap(Base):
@@ -85,6 +109,7 @@ class ReportingAppMap(Base):
     id = Column(Integer, primary_key=True)
     manager_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     app_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
     __table_args__ = (UniqueConstraint("manager_id", "app_id", name="_rm_app_uc"),)
 
 
@@ -106,8 +131,38 @@ class ReviewCycle(Base):
     quarter = Column(String, nullable=False)
     status = Column(String, default="in_progress")
     created_at = Column(DateTime, default=datetime.utcnow)
+    base_cycle_id = Column(Integer, ForeignKey("review_cycle.id"), nullable=True)
 
 
+
+class CycleJob(Base):
+    __tablename__ = "cycle_job"
+    id = Column(Integer, primary_key=True)
+    cycle_id = Column(Integer, ForeignKey("review_cycle.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued")
+    rows_total = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    rows_at_start = Column(Integer, nullable=False, default=0)
+    last_access_id = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class ExportJob(Base):
+    __tablename__ = "export_job"
+    id = Column(Integer, primary_key=True)
+    cycle_id = Column(Integer, ForeignKey("review_cycle.id"), nullable=False, index=True)
+    formats = Column(String, nullable=False, default="csv")
+    status = Column(String, nullable=False, default="queued")
+    rows_done = Column(Integer, nullable=False, default=0)
+    path = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
 class ReviewItem(Base):
     __tablename__ = "review_item"
     id = Column(Integer, primary_key=True)
@@ -120,24 +175,96 @@ class ReviewItem(Base):
     business_owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     pending_stage = Column(String, nullable=False, default="reporting_manager")
+    # stages still to come after pending_stage, packed by stage_actions.plan()
+    stage_chain = Column(Integer, nullable=False, default=0, server_default="0")
+    # bumped by every stage transition; clients may send it back as expected_version
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # per-stage decisions are in stage_decision
+    final_status = Column(String, nullable=True)
+
+    # delta cycles: the base-cycle item this one was carried forward from, and its prior decision
+    carried_from_id = Column(Integer, ForeignKey("review_item.id"), nullable=True)
+    suggested_action = Column(String, nullable=True)
+
+    # never loaded implicitly; GET /review/items/{id} asks for them
+    decisions = relationship("StageDecision", lazy="raise", order_by="StageDecision.decided_at")
+
+    __table_args__ = (
+        Index("ix_review_item_cycle_access", "cycle_id", "access_id"),
+        Index("ix_review_item_rm_inbox", "cycle_id", "pending_stage", "reporting_manager_id"),
+        Index("ix_review_item_am_inbox", "cycle_id", "pending_stage", "app_manager_id"),
+        Index("ix_review_item_ao_inbox", "cycle_id", "pending_stage", "app_owner_id"),
+        Index("ix_review_item_bo_inbox", "cycle_id", "pending_stage", "business_owner_id"),
+    )
 
-    manager_action = Column(String, nullable=True)
-    manager_comment = Column(Text, nullable=True)
-    manager_timestamp = Column(DateTime, nullable=True)
 
-    application_manager_action = Column(String, nullable=True)
-    application_manager_comment = Column(Text, nullable=True)
-    application_manager_timestamp = Column(DateTime, nullable=True)
+class StageDecision(Base):
+    # one row per stage an item was decided at, kept off review_item so inbox and list
+    # scans read narrow rows; clustered on the key in SQLite
+    __tablename__ = "stage_decision"
+    review_item_id = Column(Integer, ForeignKey("review_item.id"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    action = Column(String, nullable=False)
+    comment = Column(Text, nullable=True)
+    decided_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
-    application_owner_action = Column(String, nullable=True)
-    application_owner_comment = Column(Text, nullable=True)
-    application_owner_timestamp = Column(DateTime, nullable=True)
+    __table_args__ = {"sqlite_with_rowid": False}
 
-    business_owner_action = Column(String, nullable=True)
-    business_owner_comment = Column(Text, nullable=True)
-    business_owner_timestamp = Column(DateTime, nullable=True)
 
+class CycleStageSummary(Base):
+    __tablename__ = "cycle_stage_summary"
+    id = Column(Integer, primary_key=True)
+    cycle_id = Column(Integer, ForeignKey("review_cycle.id"), nullable=False, index=True)
+    stage = Column(String, nullable=False)
+    reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     final_status = Column(String, nullable=True)
+    item_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_cycle_stage_summary_reviewer", "cycle_id", "reviewer_id"),
+        # one row per key, the target of cycle_summary's upserts; coalesced because every
+        # key has a NULL (no reviewer once completed, no final status while pending) and
+        # a unique index never matches NULLs
+        Index(
+            "ix_cycle_stage_summary_key",
+            "cycle_id", "stage", func.coalesce(reviewer_id, literal_column("0")), func.coalesce(final_status, literal_column("''")),
+            unique=True,
+        ),
+    )
+
+
+class ReviewerDigest(Base):
+    __tablename__ = "reviewer_digest"
+    id = Column(Integer, primary_key=True)
+    reviewer_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending")
+    due_at = Column(DateTime, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        Index("ix_reviewer_digest_due", "status", "due_at"),
+        # at most one pending digest per reviewer, however many writers mark them at once
+        Index("ix_reviewer_digest_pending", "reviewer_id", unique=True,
+              sqlite_where=literal_column("status = 'pending'"), postgresql_where=literal_column("status = 'pending'")),
+    )
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    __table_args__ = (Index("ix_notification_outbox_due", "status", "next_attempt_at"),)
 
 
 class StagingChange(Base):
@@ -157,17 +284,44 @@ class ApprovalHistory(Base):
     __tablename__ = "approval_history"
     id = Column(Integer, primary_key=True)
     review_item_id = Column(Integer, ForeignKey("review_item.id"), nullable=False)
+    cycle_id = Column(Integer, ForeignKey("review_cycle.id"), nullable=True)
+    actor_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     stage = Column(String, nullable=False)
     action = Column(String, nullable=False)
     comment = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # (filter, time, id) so every filter is a range scan in /audit's keyset order
+    __table_args__ = (
+        Index("ix_approval_history_time", "timestamp", "id"),
+        Index("ix_approval_history_cycle", "cycle_id", "timestamp", "id"),
+        Index("ix_approval_history_item", "review_item_id", "timestamp", "id"),
+        Index("ix_approval_history_actor", "actor_id", "timestamp", "id"),
+        Index("ix_approval_history_action", "action", "timestamp", "id"),
+    )
 
 
 class AuditLog(Base):
     __tablename__ = "audit_log"
     id = Column(Integer, primary_key=True)
     review_item_id = Column(Integer, ForeignKey("review_item.id"), nullable=False)
+    cycle_id = Column(Integer, ForeignKey("review_cycle.id"), nullable=True)
     action = Column(String, nullable=False)
     applied_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     applied_at = Column(DateTime, default=datetime.utcnow)
     details = Column(Text, nullable=True)
+    __table_args__ = (
+        Index("ix_audit_log_time", "applied_at", "id"),
+        Index("ix_audit_log_cycle", "cycle_id", "applied_at", "id"),
+        Index("ix_audit_log_item", "review_item_id", "applied_at", "id"),
+        Index("ix_audit_log_actor", "applied_by", "applied_at", "id"),
+        Index("ix_audit_log_action", "action", "applied_at", "id"),
+    )
+
+
+class TokenRevocation(Base):
+    # session tokens of user_id issued before revoked_at are rejected
+    __tablename__ = "token_revocation"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    reason = Column(String, nullable=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
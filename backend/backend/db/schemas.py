@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 import re
+from backend.utils import stage_actions
 
 class RoleBase(BaseModel):
     name: str
@@ -50,6 +51,14 @@ class UserRole(UserRoleBase):
 class ApplicationBase(BaseModel):
     name: str
     description: Optional[str] = None
+    # review stages in order for this application's items; None is the default pipeline
+    stage_order: Optional[List[str]] = None
+
+    @field_validator("stage_order", mode="before")
+    @classmethod
+    def validate_stage_order(cls, v):
+        order = stage_actions.parse_stage_order(v)
+        return list(order) if order is not None else None
 
 class ApplicationCreate(ApplicationBase):
     pass
@@ -73,28 +82,233 @@ class Access(AccessBase):
     class Config:
         orm_mode = True
 
+class ReportingMapCreate(BaseModel):
+    manager_id: int
+    user_id: int
+
+class ReportingMap(BaseModel):
+    id: int
+    manager_id: int
+    user_id: int
+    class Config:
+        orm_mode = True
+
+class ReportingAppMapCreate(BaseModel):
+    manager_id: int
+    app_id: int
+
+class ReportingAppMap(BaseModel):
+    id: int
+    manager_id: int
+    app_id: int
+    class Config:
+        orm_mode = True
+
+class AppMapBase(BaseModel):
+    app_id: int
+    user_id: int
+
+class AppManagerMapCreate(AppMapBase):
+    pass
+
+class AppOwnerMapCreate(AppMapBase):
+    pass
+
+class BusinessOwnerMapCreate(AppMapBase):
+    pass
+
+class AppManagerMap(AppMapBase):
+    id: int
+    class Config:
+        orm_mode = True
+
+class AppOwnerMap(AppMapBase):
+    id: int
+    class Config:
+        orm_mode = True
+
+class BusinessOwnerMap(AppMapBase):
+    id: int
+    class Config:
+        orm_mode = True
+
+class ReviewCycle(BaseModel):
+    id: int
+    quarter: str
+    status: str
+    created_at: datetime
+    base_cycle_id: Optional[int] = None
+    class Config:
+        orm_mode = True
+
 class ReviewItemBase(BaseModel):
     id: int
+    cycle_id: int
     access_id: int
     reporting_manager_id: Optional[int]
     app_manager_id: Optional[int]
     app_owner_id: Optional[int]
     business_owner_id: Optional[int]
     pending_stage: str
-    manager_action: Optional[str]
-    application_manager_action: Optional[str]
-    application_owner_action: Optional[str]
-    business_owner_action: Optional[str]
+    version: int = 0
     final_status: Optional[str]
+    suggested_action: Optional[str] = None
+    carried_from_id: Optional[int] = None
 
     class Config:
         orm_mode = True
 
+class StageDecision(BaseModel):
+    stage: str
+    action: str
+    comment: Optional[str] = None
+    decided_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ReviewItemDetail(ReviewItemBase):
+    decisions: List[StageDecision]
+
+class InboxPage(BaseModel):
+    items: List[ReviewItemBase]
+    next_cursor: Optional[int]
+
+class CycleProgress(BaseModel):
+    job_id: int
+    cycle_id: int
+    status: str
+    rows_done: int
+    rows_total: int
+    rows_left: int
+    rows_per_second: Optional[float]
+    started_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    error: Optional[str]
+
+class ReviewerStageCount(BaseModel):
+    stage: str
+    reviewer_id: int
+    count: int
+
+class FinalStatusCount(BaseModel):
+    final_status: Optional[str]
+    count: int
+
+class CycleSummary(BaseModel):
+    cycle_id: int
+    total: int
+    by_stage: Dict[str, int]
+    by_reviewer: List[ReviewerStageCount]
+    by_final_status: List[FinalStatusCount]
+
+class TeamRollup(BaseModel):
+    # items pending with user_id or anyone below them
+    user_id: int
+    total: int
+    by_stage: Dict[str, int]
+
+class CycleRollup(BaseModel):
+    cycle_id: int
+    manager_id: int
+    total: int
+    by_stage: Dict[str, int]
+    own: TeamRollup
+    by_report: List[TeamRollup]
+
+class EscalationTarget(BaseModel):
+    review_item_id: int
+    pending_stage: str
+    reviewer_id: int
+    # escalate_to is `levels` up from the reviewer, or the top of a shorter chain
+    levels: int
+    escalate_to: Optional[int]
+    depth: Optional[int]
+
 class StageActionInput(BaseModel):
     review_item_id: int
     actor_user_id: int
     action: str
     comment: Optional[str] = None
+    # the item's version as last read; a mismatch is answered with 409
+    expected_version: Optional[int] = None
+
+class BatchStageActionInput(BaseModel):
+    actor_user_id: int
+    action: str
+    comment: Optional[str] = None
+    review_item_ids: Optional[List[int]] = None
+    cycle_id: Optional[int] = None
+
+class StageActionResult(BaseModel):
+    review_item_id: int
+    status: str
+    pending_stage: Optional[str] = None
+    detail: Optional[str] = None
+
+class BatchStageActionResult(BaseModel):
+    processed: int
+    failed: int
+    results: List[StageActionResult]
+
+class CycleApplyInput(BaseModel):
+    actor_user_id: int
+    dry_run: bool = False
+
+class CycleApplyResult(BaseModel):
+    cycle_id: int
+    dry_run: bool
+    items: int
+    applied: int
+    access_missing: int
+    by_action: Dict[str, int]
+
+class ExportRequest(BaseModel):
+    formats: List[str] = ["csv"]
+
+class ExportJob(BaseModel):
+    id: int
+    cycle_id: int
+    formats: str
+    status: str
+    rows_done: int
+    path: Optional[str]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    manifest: Optional[dict]
+
+class AuditEntry(BaseModel):
+    id: int
+    review_item_id: int
+    cycle_id: Optional[int]
+    action: str
+    applied_by: int
+    applied_at: Optional[datetime]
+    details: Optional[str]
+    class Config:
+        orm_mode = True
+
+class HistoryEntry(BaseModel):
+    id: int
+    review_item_id: int
+    cycle_id: Optional[int]
+    actor_id: Optional[int]
+    stage: str
+    action: str
+    comment: Optional[str]
+    timestamp: Optional[datetime]
+    class Config:
+        orm_mode = True
+
+class AuditPage(BaseModel):
+    items: List[AuditEntry]
+    next_cursor: Optional[str]
+
+class HistoryPage(BaseModel):
+    items: List[HistoryEntry]
+    next_cursor: Optional[str]
 
 class LoginRequest(BaseModel):
     business_user_id: str
@@ -102,6 +316,11 @@ class LoginRequest(BaseModel):
 class LoginResponse(BaseModel):
     user: User
     roles: List[Role]
+    token: str
+    token_type: str = "bearer"
+    expires_at: datetime
+    # stage -> app ids the user is mapped to review
+    scope: Dict[str, List[int]]
 
 class StagingChangeBase(BaseModel):
     review_item_id: int
@@ -1,13 +1,55 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateIndex
 from fastapi.middleware.cors import CORSMiddleware
-from backend.db.database import Base, engine
-from backend.routers import users, roles, user_roles, applications, access, review, auth, mappings
+from backend.db.database import Base, engine, describe_profile, is_sqlite
+from backend.routers import users, roles, user_roles, applications, access, review, auth, mappings, imports, audit
+from backend.utils import cycle_summary, metrics, notifications, reporting_closure, stage_actions
 
 # create tables
+tables_before = set(inspect(engine).get_table_names())
 Base.metadata.create_all(bind=engine)
+# create_all skips new columns and indexes on tables that already exist
+with engine.begin() as conn:
+    inspector = inspect(conn)
+    added = set()
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        if table.name == "review_item":
+            review_item_columns = existing
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=engine.dialect)}"))
+                added.add((table.name, column.name))
+    if ("review_item", "stage_chain") in added:
+        stage_actions.backfill_chains(conn)
+    # decisions moved from review_item columns to stage_decision
+    stage_actions.migrate_decisions(conn, review_item_columns)
+    if "reporting_closure" not in tables_before:
+        reporting_closure.rebuild(conn)
+    # counts of cycles from before cycle_stage_summary existed were never recorded, and a
+    # table from before its unique key may hold one key twice: recount both
+    if "cycle_stage_summary" not in tables_before or cycle_summary.has_duplicate_keys(conn):
+        cycle_summary.rebuild(conn)
+    # likewise reviewer_digest from before one pending digest per reviewer was enforced
+    notifications.drop_duplicate_pending(conn)
+# IF NOT EXISTS rather than checkfirst: SQLite reflection skips expression indexes
+with engine.begin() as conn:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+# sampled planner stats (milliseconds even on large tables) so multi-filter queries such as
+# /audit pick the most selective index rather than the first one that matches
+if is_sqlite:
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA analysis_limit=1000"))
+        conn.execute(text("ANALYZE"))
 
 app = FastAPI(title="Access Review POC API - v2")
 
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
@@ -24,7 +66,17 @@ app.include_router(applications.router)
 app.include_router(access.router)
 app.include_router(mappings.router)
 app.include_router(review.router)
+app.include_router(imports.router)
+app.include_router(audit.router)
 
 @app.get("/")
 def root():
     return {"message": "Access Review POC API v2 running"}
+
+@app.get("/db-profile")
+def db_profile():
+    return describe_profile()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
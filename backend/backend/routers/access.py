@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import datetime
 from backend.db.database import get_db
 from backend.db import models, schemas
+from backend.utils.streaming import ListParams, list_response
+from backend.utils.query_budget import route_budget
 
-router = APIRouter(prefix="/access", tags=["Access"])
+router = APIRouter(prefix="/access", tags=["Access"], dependencies=[route_budget(4)])
 
 @router.post("/", response_model=schemas.Access)
 def create_access(access: schemas.AccessCreate, db: Session = Depends(get_db)):
@@ -21,5 +24,5 @@ def create_access(access: schemas.AccessCreate, db: Session = Depends(get_db)):
     return db_access
 
 @router.get("/", response_model=list[schemas.Access])
-def list_access(db: Session = Depends(get_db)):
-    return db.query(models.Access).all()
+def list_access(params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_response(db, select(models.Access).order_by(models.Access.id), schemas.Access, params)
@@ -1,18 +1,38 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from backend.db.database import get_db
 from backend.db import models, schemas
+from backend.utils.catalog_cache import catalog
+from backend.utils.streaming import ListParams
+from backend.utils.query_budget import route_budget
 
-router = APIRouter(prefix="/applications", tags=["Applications"])
+router = APIRouter(prefix="/applications", tags=["Applications"], dependencies=[route_budget(2)])
+
+def _stored(stage_order):
+    return ",".join(stage_order) if stage_order is not None else None
 
 @router.post("/", response_model=schemas.Application)
 def create_application(app: schemas.ApplicationCreate, db: Session = Depends(get_db)):
-    db_app = models.Application(name=app.name, description=app.description)
+    db_app = models.Application(name=app.name, description=app.description, stage_order=_stored(app.stage_order))
     db.add(db_app)
     db.commit()
     db.refresh(db_app)
+    catalog.bump(models.Application)
+    return db_app
+
+# a new stage order applies to items of cycles started afterwards
+@router.put("/{app_id}", response_model=schemas.Application, dependencies=[route_budget(3)])
+def update_application(app_id: int, app: schemas.ApplicationCreate, db: Session = Depends(get_db)):
+    db_app = db.get(models.Application, app_id)
+    if not db_app:
+        raise HTTPException(404, "Application not found")
+    db_app.name, db_app.description, db_app.stage_order = app.name, app.description, _stored(app.stage_order)
+    db.commit()
+    db.refresh(db_app)
+    catalog.bump(models.Application)
     return db_app
 
 @router.get("/", response_model=list[schemas.Application])
-def list_applications(db: Session = Depends(get_db)):
-    return db.query(models.Application).all()
+def list_applications(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.Application).order_by(models.Application.id), schemas.Application, params)
@@ -0,0 +1,47 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from backend.db.database import get_read_db, execute
+from backend.db import schemas
+from backend.utils import audit
+from backend.utils.query_budget import route_budget
+
+router = APIRouter(prefix="/audit", tags=["Audit"], dependencies=[route_budget(1)])
+
+
+class AuditFilters:
+    def __init__(
+        self,
+        cycle_id: Optional[int] = None,
+        review_item_id: Optional[int] = None,
+        actor_id: Optional[int] = None,
+        action: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000),
+    ):
+        self.filters = {"cycle_id": cycle_id, "review_item_id": review_item_id, "actor_id": actor_id, "action": action}
+        self.since = since
+        self.until = until
+        self.cursor = cursor
+        self.limit = limit
+
+
+async def _page(db, source: str, f: AuditFilters) -> dict:
+    try:
+        stmt = audit.page_query(source, f.filters, f.since, f.until, f.cursor, f.limit)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    rows = (await execute(db, stmt)).scalars().all()
+    return audit.page(rows, source, f.limit)
+
+
+@router.get("/log", response_model=schemas.AuditPage)
+async def audit_log(f: AuditFilters = Depends(), db=Depends(get_read_db)):
+    return await _page(db, "log", f)
+
+
+@router.get("/history", response_model=schemas.HistoryPage)
+async def approval_history(f: AuditFilters = Depends(), db=Depends(get_read_db)):
+    return await _page(db, "history", f)
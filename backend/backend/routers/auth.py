@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from backend.db.database import get_db
 from backend.db import models, schemas
+from backend.utils import session_tokens
+from backend.utils.query_budget import route_budget
 
-router = APIRouter(prefix="/auth", tags=["Auth"])
+router = APIRouter(prefix="/auth", tags=["Auth"], dependencies=[route_budget(3)])
 
 @router.post("/login", response_model=schemas.LoginResponse)
 def login(payload: schemas.LoginRequest, db: Session = Depends(get_db)):
@@ -11,4 +13,6 @@ def login(payload: schemas.LoginRequest, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(404, "User not found")
     user_roles = db.query(models.Role).join(models.UserRole, models.UserRole.role_id == models.Role.id).filter(models.UserRole.user_id == user.id).all()
-    return schemas.LoginResponse(user=user, roles=user_roles)
+    scope = session_tokens.reviewer_scope(db, user.id)
+    token, expires_at = session_tokens.issue(user.id, [r.name for r in user_roles], scope)
+    return {"user": user, "roles": user_roles, "token": token, "expires_at": expires_at, "scope": scope}
@@ -0,0 +1,27 @@
+import codecs
+import tempfile
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+from backend.utils import bulk_import
+from backend.utils.query_budget import route_budget
+
+router = APIRouter(prefix="/import", tags=["Import"], dependencies=[route_budget(5)])
+
+@router.post("/{kind}")
+async def import_rows(kind: str, request: Request, format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"), dry_run: bool = False):
+    if kind not in bulk_import.KINDS:
+        raise HTTPException(404, f"kind must be one of {', '.join(bulk_import.KINDS)}")
+    if format is None:
+        format = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+
+    # spool the body so the import reads it as a file without holding it all in memory
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    try:
+        stream = codecs.getreader("utf-8")(spool)
+        return await run_in_threadpool(bulk_import.import_rows, kind, stream, format, dry_run)
+    finally:
+        spool.close()
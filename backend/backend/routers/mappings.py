@@ -1,9 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from backend.db.database import get_db
-from backend.db import models
+from backend.db import models, schemas
+from backend.utils import reporting_closure
+from backend.utils.reviewer_resolver import resolver
+from backend.utils.session_tokens import revocations
+from backend.utils.stage_actions import first_stage, parse_stage_order
+from backend.utils.catalog_cache import catalog
+from backend.utils.streaming import ListParams
+from backend.utils.query_budget import route_budget
 
-router = APIRouter(prefix="/mappings", tags=["Mappings"])
+router = APIRouter(prefix="/mappings", tags=["Mappings"], dependencies=[route_budget(4)])
+
+# the closure table is extended in the same transaction: one check, one insert
+@router.post("/reporting", response_model=schemas.ReportingMap, dependencies=[route_budget(5)])
+def create_reporting_map(body: schemas.ReportingMapCreate, db: Session = Depends(get_db)):
+    if db.query(models.ReportingMap).filter(models.ReportingMap.manager_id == body.manager_id, models.ReportingMap.user_id == body.user_id).first():
+        raise HTTPException(400, "Mapping already exists")
+    try:
+        reporting_closure.link(db, body.user_id, body.manager_id)
+    except reporting_closure.ReportingCycleError as exc:
+        raise HTTPException(400, str(exc))
+    m = models.ReportingMap(manager_id=body.manager_id, user_id=body.user_id)
+    db.add(m)
+    db.commit()
+    db.refresh(m)
+    resolver.add(m)
+    catalog.bump(type(m))
+    return m
+
+@router.get("/reporting", response_model=list[schemas.ReportingMap])
+def list_reporting_maps(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.ReportingMap).order_by(models.ReportingMap.id), schemas.ReportingMap, params)
 
 @router.post("/reporting-app")
 def create_reporting_app_map(body: dict, db: Session = Depends(get_db)):
@@ -15,10 +44,82 @@ def create_reporting_app_map(body: dict, db: Session = Depends(get_db)):
         raise HTTPException(400, "Mapping exists")
     m = models.ReportingAppMap(manager_id=manager_id, app_id=app_id)
     db.add(m)
+    revocations.revoke(db, [manager_id], "scope_changed")
     db.commit()
     db.refresh(m)
+    resolver.add(m)
+    catalog.bump(type(m))
     return {"id": m.id, "manager_id": m.manager_id, "app_id": m.app_id}
 
-@router.get("/reporting-app")
-def list_reporting_app_maps(db: Session = Depends(get_db)):
-    return db.query(models.ReportingAppMap).all()
+@router.get("/reporting-app", response_model=list[schemas.ReportingAppMap])
+def list_reporting_app_maps(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.ReportingAppMap).order_by(models.ReportingAppMap.id), schemas.ReportingAppMap, params)
+
+@router.post("/app-manager", response_model=schemas.AppManagerMap)
+def create_app_manager_map(body: schemas.AppManagerMapCreate, db: Session = Depends(get_db)):
+    m = models.AppManagerMap(app_id=body.app_id, user_id=body.user_id)
+    db.add(m)
+    revocations.revoke(db, [body.user_id], "scope_changed")
+    db.commit()
+    db.refresh(m)
+    resolver.add(m)
+    catalog.bump(type(m))
+    return m
+
+@router.get("/app-manager", response_model=list[schemas.AppManagerMap])
+def list_app_manager_maps(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.AppManagerMap).order_by(models.AppManagerMap.id), schemas.AppManagerMap, params)
+
+@router.post("/app-owner", response_model=schemas.AppOwnerMap)
+def create_app_owner_map(body: schemas.AppOwnerMapCreate, db: Session = Depends(get_db)):
+    m = models.AppOwnerMap(app_id=body.app_id, user_id=body.user_id)
+    db.add(m)
+    revocations.revoke(db, [body.user_id], "scope_changed")
+    db.commit()
+    db.refresh(m)
+    resolver.add(m)
+    catalog.bump(type(m))
+    return m
+
+@router.get("/app-owner", response_model=list[schemas.AppOwnerMap])
+def list_app_owner_maps(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.AppOwnerMap).order_by(models.AppOwnerMap.id), schemas.AppOwnerMap, params)
+
+@router.post("/business-owner", response_model=schemas.BusinessOwnerMap)
+def create_bo_map(body: schemas.BusinessOwnerMapCreate, db: Session = Depends(get_db)):
+    m = models.BusinessOwnerMap(app_id=body.app_id, user_id=body.user_id)
+    db.add(m)
+    revocations.revoke(db, [body.user_id], "scope_changed")
+    db.commit()
+    db.refresh(m)
+    resolver.add(m)
+    catalog.bump(type(m))
+    return m
+
+@router.get("/business-owner", response_model=list[schemas.BusinessOwnerMap])
+def list_bo_maps(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.BusinessOwnerMap).order_by(models.BusinessOwnerMap.id), schemas.BusinessOwnerMap, params)
+
+# a cold resolver loads every mapping table once
+@router.get("/reviewers", dependencies=[route_budget(7)])
+def resolve_reviewers(user_id: int, app_id: int, db: Session = Depends(get_db)):
+    reviewers = resolver.reviewers(db, user_id, app_id)
+    order = parse_stage_order(db.scalar(select(models.Application.stage_order).where(models.Application.id == app_id)))
+    return {
+        "user_id": user_id,
+        "app_id": app_id,
+        "reporting_manager_id": reviewers[0],
+        "app_manager_id": reviewers[1],
+        "app_owner_id": reviewers[2],
+        "business_owner_id": reviewers[3],
+        "first_stage": first_stage(reviewers, order),
+    }
+
+@router.get("/resolver/stats")
+def resolver_stats():
+    return resolver.stats()
+
+@router.post("/resolver/invalidate")
+def invalidate_resolver():
+    resolver.invalidate()
+    return resolver.stats()
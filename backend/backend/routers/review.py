@@ -1,259 +1,362 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
-from backend.db.database import get_db
+import os
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy import select, union_all, and_, func
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional
+from backend.config import settings
+from backend.db.database import get_db, get_read_db, execute
 from backend.db import models, schemas
-
-router = APIRouter(prefix="/review", tags=["Review & Workflow"])
-
-@router.post("/start-cycle")
-def start_cycle(quarter: str, db: Session = Depends(get_db)):
-    cycle = models.ReviewCycle(quarter=quarter, status="in_progress")
+from backend.utils import compliance_export, cycle_generation, cycle_summary, notifications, reporting_closure, stage_actions, staging_apply
+from backend.utils.streaming import ListParams, list_response_async
+from backend.utils.query_budget import route_budget
+from backend.utils.session_tokens import Principal, authorize_actor, authorize_admin, authorize_reader, current_principal
+
+router = APIRouter(prefix="/review", tags=["Review & Workflow"], dependencies=[route_budget(3)])
+
+# a stage action costs the same statements for one item or a cycle's worth
+action_budget = route_budget(12)
+
+@router.post("/start-cycle", dependencies=[route_budget(19)])
+def start_cycle(
+    quarter: str,
+    background_tasks: BackgroundTasks,
+    mode: str = "sync",
+    base_cycle_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    principal: Optional[Principal] = Depends(current_principal),
+):
+    authorize_admin(principal)
+    if mode not in ("sync", "job"):
+        raise HTTPException(400, "mode must be 'sync' or 'job'")
+    base_cycle = None
+    if base_cycle_id is not None:
+        if mode == "job":
+            raise HTTPException(400, "Delta cycles are generated in sync mode")
+        base_cycle = db.get(models.ReviewCycle, base_cycle_id)
+        if not base_cycle:
+            raise HTTPException(404, "Base cycle not found")
+    cycle = models.ReviewCycle(quarter=quarter, status="in_progress" if mode == "sync" else "generating", base_cycle_id=base_cycle_id)
     db.add(cycle)
     db.commit()
     db.refresh(cycle)
 
-    accesses = db.query(models.Access).filter(models.Access.active == True).all()
-
-    for acc in accesses:
-        rm_map = db.query(models.ReportingMap).filter(models.ReportingMap.user_id == acc.user_id).first()
-        reporting_manager_id = rm_map.manager_id if rm_map else None
-
-        if reporting_manager_id:
-            rm_app = db.query(models.ReportingAppMap).filter(models.ReportingAppMap.manager_id == reporting_manager_id, models.ReportingAppMap.app_id == acc.application_id).first()
-            if not rm_app:
-                reporting_manager_id = None
-
-        am_map = db.query(models.AppManagerMap).filter(models.AppManagerMap.app_id == acc.application_id).first()
-        app_manager_id = am_map.user_id if am_map else None
-
-        ao_map = db.query(models.AppOwnerMap).filter(models.AppOwnerMap.app_id == acc.application_id).first()
-        app_owner_id = ao_map.user_id if ao_map else None
-
-        bo_map = db.query(models.BusinessOwnerMap).filter(models.BusinessOwnerMap.app_id == acc.application_id).first()
-        business_owner_id = bo_map.user_id if bo_map else None
-
-        if reporting_manager_id:
-            pending_stage = "reporting_manager"
-        elif app_manager_id:
-            pending_stage = "app_manager"
-        elif app_owner_id:
-            pending_stage = "app_owner"
-        elif business_owner_id:
-            pending_stage = "business_owner"
-        else:
-            pending_stage = "completed"
-
-        item = models.ReviewItem(
-            cycle_id=cycle.id,
-            access_id=acc.id,
-            reporting_manager_id=reporting_manager_id,
-            app_manager_id=app_manager_id,
-            app_owner_id=app_owner_id,
-            business_owner_id=business_owner_id,
-            pending_stage=pending_stage,
-        )
-        db.add(item)
+    if base_cycle is not None:
+        counts = cycle_generation.generate_delta(db, cycle.id, base_cycle)
+        notifications.mark_cycle(db, cycle.id)
+        db.commit()
+        background_tasks.add_task(notifications.send_pending)
+        return {"message": "Delta review cycle started", "cycle_id": cycle.id, "base_cycle_id": base_cycle_id, **counts}
+
+    if mode == "job":
+        job = cycle_generation.enqueue_job(db, cycle.id)
+        if settings.CYCLE_JOB_IN_PROCESS:
+            background_tasks.add_task(cycle_generation.run_job, job.id)
+        return {"message": "Review cycle generation queued", "cycle_id": cycle.id, "job_id": job.id}
 
+    cycle_generation.generate_items(db, cycle.id)
+    notifications.mark_cycle(db, cycle.id)
     db.commit()
+    background_tasks.add_task(notifications.send_pending)
     return {"message": "Review cycle started", "cycle_id": cycle.id}
 
 
+@router.get("/cycles/{cycle_id}/progress", response_model=schemas.CycleProgress)
+async def cycle_progress(cycle_id: int, db=Depends(get_read_db)):
+    stmt = select(models.CycleJob).where(models.CycleJob.cycle_id == cycle_id).order_by(models.CycleJob.id.desc()).limit(1)
+    job = (await execute(db, stmt)).scalar()
+    if not job:
+        raise HTTPException(404, "No generation job for this cycle")
+    return cycle_generation.progress(job)
+
+
+@router.get("/cycles/{cycle_id}/summary", response_model=schemas.CycleSummary)
+async def get_cycle_summary(cycle_id: int, db=Depends(get_read_db)):
+    summary = models.CycleStageSummary
+    stmt = (
+        select(summary.stage, summary.reviewer_id, summary.final_status, summary.item_count)
+        .where(summary.cycle_id == cycle_id, summary.item_count != 0)
+    )
+    rows = (await execute(db, stmt)).all()
+    if not rows and (await execute(db, select(models.ReviewCycle.id).where(models.ReviewCycle.id == cycle_id))).scalar() is None:
+        raise HTTPException(404, "Cycle not found")
+    return cycle_summary.summarize(cycle_id, rows)
+
+
+def _team_rollup(user_id: int, counts: dict) -> dict:
+    return {"user_id": user_id, "total": sum(counts.values()), "by_stage": counts}
+
+
+# pending items under a manager from cycle_stage_summary, split by direct report: one
+# query over the manager's reporting_closure rows whatever the depth of the org
+@router.get("/cycles/{cycle_id}/rollup", response_model=schemas.CycleRollup)
+async def get_cycle_rollup(cycle_id: int, manager_id: int, db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    authorize_reader(principal, manager_id)
+    summary = models.CycleStageSummary
+    heads = reporting_closure.report_heads(manager_id)
+    stmt = (
+        select(heads.c.head_id, summary.stage, func.sum(summary.item_count))
+        .join(summary, and_(summary.cycle_id == cycle_id, summary.reviewer_id == heads.c.member_id))
+        .where(summary.stage != "completed", summary.item_count != 0)
+        .group_by(heads.c.head_id, summary.stage)
+    )
+    rows = (await execute(db, stmt)).all()
+    if not rows and (await execute(db, select(models.ReviewCycle.id).where(models.ReviewCycle.id == cycle_id))).scalar() is None:
+        raise HTTPException(404, "Cycle not found")
+
+    by_head, by_stage = {}, {}
+    for head_id, stage, count in rows:
+        by_head.setdefault(head_id, {})[stage] = count
+        by_stage[stage] = by_stage.get(stage, 0) + count
+    own = by_head.pop(manager_id, {})
+    by_report = sorted((_team_rollup(u, counts) for u, counts in by_head.items()), key=lambda r: (-r["total"], r["user_id"]))
+    return {
+        "cycle_id": cycle_id,
+        "manager_id": manager_id,
+        "total": sum(by_stage.values()),
+        "by_stage": by_stage,
+        "own": _team_rollup(manager_id, own),
+        "by_report": by_report,
+    }
+
+
+@router.post("/cycles/{cycle_id}/apply", response_model=schemas.CycleApplyResult, dependencies=[route_budget(9)])
+def apply_cycle(cycle_id: int, payload: schemas.CycleApplyInput, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    authorize_actor(principal, payload.actor_user_id)
+    authorize_admin(principal)
+    if not db.get(models.ReviewCycle, cycle_id):
+        raise HTTPException(404, "Cycle not found")
+    return staging_apply.apply_cycle(db, cycle_id, payload.actor_user_id, dry_run=payload.dry_run)
+
+
+@router.post("/cycles/{cycle_id}/exports", response_model=schemas.ExportJob)
+def start_export(
+    cycle_id: int,
+    payload: schemas.ExportRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    principal: Optional[Principal] = Depends(current_principal),
+):
+    authorize_reader(principal)
+    if not db.get(models.ReviewCycle, cycle_id):
+        raise HTTPException(404, "Cycle not found")
+    available = compliance_export.available_formats()
+    unknown = [f for f in payload.formats if f not in available]
+    if unknown or not payload.formats:
+        raise HTTPException(400, f"formats must be from: {', '.join(available)}")
+    job = compliance_export.enqueue_export(db, cycle_id, list(dict.fromkeys(payload.formats)))
+    background_tasks.add_task(compliance_export.run_export_job, job.id)
+    return compliance_export.job_view(job)
+
+
+def _export_job(db: Session, cycle_id: int, job_id: int) -> models.ExportJob:
+    job = db.get(models.ExportJob, job_id)
+    if not job or job.cycle_id != cycle_id:
+        raise HTTPException(404, "Export job not found")
+    return job
+
+
+@router.get("/cycles/{cycle_id}/exports/{job_id}", response_model=schemas.ExportJob)
+def get_export(cycle_id: int, job_id: int, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    authorize_reader(principal)
+    return compliance_export.job_view(_export_job(db, cycle_id, job_id))
+
+
+@router.get("/cycles/{cycle_id}/exports/{job_id}/files/{name}")
+def download_export(cycle_id: int, job_id: int, name: str, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    authorize_reader(principal)
+    job = _export_job(db, cycle_id, job_id)
+    manifest = compliance_export.read_manifest(job)
+    # only files listed in the manifest are served
+    if not manifest or name not in {f["name"] for f in manifest["files"]} | {compliance_export.MANIFEST}:
+        raise HTTPException(404, "Export file not found")
+    return FileResponse(os.path.join(job.path, name), filename=name)
+
+
+def _pending_for(stage: str, user_id: int, cycle_id: int, scope: str = "own"):
+    reviewer = stage_actions.REVIEWER_COLUMNS[stage]
+    return and_(
+        models.ReviewItem.cycle_id == cycle_id,
+        models.ReviewItem.pending_stage == stage,
+        reviewer == user_id if scope == "own" else reviewer.in_(reporting_closure.team(user_id)),
+    )
+
+
+async def _stage_items(db, principal: Optional[Principal], stage: str, user_id: int, cycle_id: int, params: ListParams):
+    authorize_reader(principal, user_id)
+    stmt = select(models.ReviewItem).where(_pending_for(stage, user_id, cycle_id)).order_by(models.ReviewItem.id)
+    return await list_response_async(db, stmt, schemas.ReviewItemBase, params)
+
+
+@router.get("/cycles", response_model=list[schemas.ReviewCycle])
+async def list_cycles(params: ListParams = Depends(), db=Depends(get_read_db)):
+    stmt = select(models.ReviewCycle).order_by(models.ReviewCycle.created_at.desc())
+    return await list_response_async(db, stmt, schemas.ReviewCycle, params)
+
+
+# a whole cycle's items: admins and auditors only, reviewers read theirs from the inbox
+@router.get("/items", response_model=list[schemas.ReviewItemBase])
+async def list_items(cycle_id: int, params: ListParams = Depends(), db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    authorize_reader(principal)
+    stmt = select(models.ReviewItem).where(models.ReviewItem.cycle_id == cycle_id).order_by(models.ReviewItem.id)
+    return await list_response_async(db, stmt, schemas.ReviewItemBase, params)
+
+
+# stage decisions are only read here, one primary-key range off the item
+@router.get("/items/{item_id}", response_model=schemas.ReviewItemDetail)
+async def get_item(item_id: int, db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    stmt = select(models.ReviewItem).where(models.ReviewItem.id == item_id).options(selectinload(models.ReviewItem.decisions))
+    item = (await execute(db, stmt)).scalar()
+    if item is None:
+        raise HTTPException(404, "Review item not found")
+    authorize_reader(principal, *[getattr(item, col.key) for col in stage_actions.REVIEWER_COLUMNS.values()])
+    return item
+
+
+@router.get("/inbox", response_model=schemas.InboxPage)
+async def inbox(
+    user_id: int,
+    cycle_id: int,
+    stage: Optional[str] = None,
+    cursor: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    scope: str = Query("own", pattern="^(own|subtree)$"),
+    db=Depends(get_read_db),
+    principal: Optional[Principal] = Depends(current_principal),
+):
+    authorize_reader(principal, user_id)
+    if stage is not None and stage not in stage_actions.STAGES:
+        raise HTTPException(400, f"stage must be one of {', '.join(stage_actions.STAGES)}")
+    stages = [stage] if stage else stage_actions.STAGES
+
+    # one bounded range scan per stage index, merged on id; scope=subtree probes the
+    # index once per person in user_id's reporting_closure subtree
+    per_stage = [
+        select(models.ReviewItem.id)
+        .where(_pending_for(s, user_id, cycle_id, scope), models.ReviewItem.id > cursor)
+        .order_by(models.ReviewItem.id)
+        .limit(limit + 1)
+        .subquery()
+        for s in stages
+    ]
+    ids = union_all(*[select(sq.c.id) for sq in per_stage])
+    stmt = select(models.ReviewItem).where(models.ReviewItem.id.in_(ids)).order_by(models.ReviewItem.id).limit(limit + 1)
+    items = (await execute(db, stmt)).scalars().all()
+
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
+
+# skip-level escalation: the pending reviewer's manager `levels` up, from reporting_closure
+@router.get("/items/{item_id}/escalation", response_model=schemas.EscalationTarget)
+async def get_escalation(
+    item_id: int,
+    levels: int = Query(1, ge=1, le=50),
+    db=Depends(get_read_db),
+    principal: Optional[Principal] = Depends(current_principal),
+):
+    item = models.ReviewItem
+    stmt = select(item.pending_stage, *stage_actions.REVIEWER_COLUMNS.values()).where(item.id == item_id)
+    row = (await execute(db, stmt)).first()
+    if row is None:
+        raise HTTPException(404, "Review item not found")
+    authorize_reader(principal, *row[1:])
+    pending_stage = row.pending_stage
+    reviewer_id = dict(zip(stage_actions.REVIEWER_COLUMNS, row[1:])).get(pending_stage)
+    if reviewer_id is None:
+        raise HTTPException(400, "Item is not pending with a reviewer")
+    target = (await execute(db, reporting_closure.escalation_target(reviewer_id, levels))).first()
+    return {
+        "review_item_id": item_id,
+        "pending_stage": pending_stage,
+        "reviewer_id": reviewer_id,
+        "levels": levels,
+        "escalate_to": target.ancestor_id if target else None,
+        "depth": target.depth if target else None,
+    }
+
+
 @router.get("/reporting-manager/items", response_model=list[schemas.ReviewItemBase])
-def get_rm_items(user_id: int, cycle_id: int, db: Session = Depends(get_db)):
-    items = db.query(models.ReviewItem).filter(models.ReviewItem.cycle_id == cycle_id, models.ReviewItem.reporting_manager_id == user_id, models.ReviewItem.pending_stage == "reporting_manager").all()
-    return items
+async def get_rm_items(user_id: int, cycle_id: int, params: ListParams = Depends(), db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    return await _stage_items(db, principal, "reporting_manager", user_id, cycle_id, params)
 
 @router.get("/app-manager/items", response_model=list[schemas.ReviewItemBase])
-def get_app_mgr_items(user_id: int, cycle_id: int, db: Session = Depends(get_db)):
-    items = db.query(models.ReviewItem).filter(models.ReviewItem.cycle_id == cycle_id, models.ReviewItem.app_manager_id == user_id, models.ReviewItem.pending_stage == "app_manager").all()
-    return items
+async def get_app_mgr_items(user_id: int, cycle_id: int, params: ListParams = Depends(), db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    return await _stage_items(db, principal, "app_manager", user_id, cycle_id, params)
 
 @router.get("/app-owner/items", response_model=list[schemas.ReviewItemBase])
-def get_app_owner_items(user_id: int, cycle_id: int, db: Session = Depends(get_db)):
-    items = db.query(models.ReviewItem).filter(models.ReviewItem.cycle_id == cycle_id, models.ReviewItem.app_owner_id == user_id, models.ReviewItem.pending_stage == "app_owner").all()
-    return items
+async def get_app_owner_items(user_id: int, cycle_id: int, params: ListParams = Depends(), db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    return await _stage_items(db, principal, "app_owner", user_id, cycle_id, params)
 
 @router.get("/business-owner/items", response_model=list[schemas.ReviewItemBase])
-def get_bo_items(user_id: int, cycle_id: int, db: Session = Depends(get_db)):
-    items = db.query(models.ReviewItem).filter(models.ReviewItem.cycle_id == cycle_id, models.ReviewItem.business_owner_id == user_id, models.ReviewItem.pending_stage == "business_owner").all()
-    return items
+async def get_bo_items(user_id: int, cycle_id: int, params: ListParams = Depends(), db=Depends(get_read_db), principal: Optional[Principal] = Depends(current_principal)):
+    return await _stage_items(db, principal, "business_owner", user_id, cycle_id, params)
 
 
-@router.post("/reporting-manager/action")
-def reporting_manager_action(payload: schemas.StageActionInput, db: Session = Depends(get_db)):
-    item = db.query(models.ReviewItem).filter(models.ReviewItem.id == payload.review_item_id).first()
-    if not item:
-        raise HTTPException(404, "Review item not found")
-    if item.pending_stage != "reporting_manager":
-        raise HTTPException(400, "Item is not at Reporting Manager stage")
-    if item.reporting_manager_id != payload.actor_user_id:
-        raise HTTPException(403, "Not authorized for this item")
-
-    item.manager_action = payload.action
-    item.manager_comment = payload.comment
-    item.manager_timestamp = datetime.utcnow()
-
-    staging = db.query(models.StagingChange).filter(models.StagingChange.review_item_id == item.id, models.StagingChange.applied == False).first()
-    if staging is None:
-        staging = models.StagingChange(review_item_id=item.id, proposed_action=payload.action, proposed_by_id=payload.actor_user_id, payload=payload.comment or None, last_stage="reporting_manager")
-        db.add(staging)
-    else:
-        staging.proposed_action = payload.action
-        staging.payload = payload.comment or staging.payload
-        staging.proposed_by_id = payload.actor_user_id
-        staging.last_stage = "reporting_manager"
-        staging.proposed_at = datetime.utcnow()
-
-    if item.app_manager_id:
-        item.pending_stage = "app_manager"
-    elif item.app_owner_id:
-        item.pending_stage = "app_owner"
-    elif item.business_owner_id:
-        item.pending_stage = "business_owner"
-    else:
-        item.pending_stage = "completed"
-        item.final_status = payload.action
+def _notify_handoffs(background_tasks: BackgroundTasks, results: list):
+    # apply_stage_action marked the reviewers in the committed transaction; this only sends
+    if any(r["status"] == "ok" and r["pending_stage"] != "completed" for r in results):
+        background_tasks.add_task(notifications.send_pending)
 
+
+def _single_action(db: Session, principal: Optional[Principal], stage: str, payload: schemas.StageActionInput, background_tasks: BackgroundTasks):
+    authorize_actor(principal, payload.actor_user_id, stage)
+    [result] = stage_actions.apply_stage_action(
+        db, stage, payload.actor_user_id, payload.action, payload.comment,
+        item_ids=[payload.review_item_id], expected_version=payload.expected_version,
+    )
+    if result["status"] != "ok":
+        db.rollback()
+        raise HTTPException(stage_actions.ERROR_STATUS_CODES[result["status"]], result["detail"])
     db.commit()
-    return {"message": "Reporting manager action recorded and staging saved"}
+    _notify_handoffs(background_tasks, [result])
 
 
-@router.post("/app-manager/action")
-def app_manager_action(payload: schemas.StageActionInput, db: Session = Depends(get_db)):
-    item = db.query(models.ReviewItem).filter(models.ReviewItem.id == payload.review_item_id).first()
-    if not item:
-        raise HTTPException(404, "Review item not found")
-    if item.pending_stage != "app_manager":
-        raise HTTPException(400, "Item is not at Application Manager stage")
-    if item.app_manager_id != payload.actor_user_id:
-        raise HTTPException(403, "Not authorized for this item")
-
-    item.application_manager_action = payload.action
-    item.application_manager_comment = payload.comment
-    item.application_manager_timestamp = datetime.utcnow()
-
-    staging = db.query(models.StagingChange).filter(models.StagingChange.review_item_id == item.id, models.StagingChange.applied == False).first()
-    if staging is None:
-        staging = models.StagingChange(review_item_id=item.id, proposed_action=payload.action, proposed_by_id=payload.actor_user_id, payload=payload.comment or None, last_stage="app_manager")
-        db.add(staging)
-    else:
-        staging.last_stage = "app_manager"
-        staging.proposed_action = payload.action
-        staging.payload = payload.comment or staging.payload
-        staging.proposed_by_id = payload.actor_user_id
-        staging.proposed_at = datetime.utcnow()
-
-    if item.app_owner_id:
-        item.pending_stage = "app_owner"
-    elif item.business_owner_id:
-        item.pending_stage = "business_owner"
-    else:
-        item.pending_stage = "completed"
-        item.final_status = payload.action
+@router.post("/reporting-manager/action", dependencies=[action_budget])
+def reporting_manager_action(payload: schemas.StageActionInput, background_tasks: BackgroundTasks, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    _single_action(db, principal, "reporting_manager", payload, background_tasks)
+    return {"message": "Reporting manager action recorded and staging saved"}
 
-    db.commit()
-    return {"message": "Application manager action recorded and staging updated"}
 
+@router.post("/app-manager/action", dependencies=[action_budget])
+def app_manager_action(payload: schemas.StageActionInput, background_tasks: BackgroundTasks, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    _single_action(db, principal, "app_manager", payload, background_tasks)
+    return {"message": "Application manager action recorded and staging updated"}
 
-@router.post("/app-owner/action")
-def app_owner_action(payload: schemas.StageActionInput, db: Session = Depends(get_db)):
-    item = db.query(models.ReviewItem).filter(models.ReviewItem.id == payload.review_item_id).first()
-    if not item:
-        raise HTTPException(404, "Review item not found")
-    if item.pending_stage != "app_owner":
-        raise HTTPException(400, "Item is not at Application Owner stage")
-    if item.app_owner_id != payload.actor_user_id:
-        raise HTTPException(403, "Not authorized for this item")
-
-    item.application_owner_action = payload.action
-    item.application_owner_comment = payload.comment
-    item.application_owner_timestamp = datetime.utcnow()
-
-    staging = db.query(models.StagingChange).filter(models.StagingChange.review_item_id == item.id, models.StagingChange.applied == False).first()
-    if staging is None:
-        staging = models.StagingChange(review_item_id=item.id, proposed_action=payload.action, proposed_by_id=payload.actor_user_id, payload=payload.comment or None, last_stage="app_owner")
-        db.add(staging)
-    else:
-        staging.last_stage = "app_owner"
-        staging.proposed_action = payload.action
-        staging.payload = payload.comment or staging.payload
-        staging.proposed_by_id = payload.actor_user_id
-        staging.proposed_at = datetime.utcnow()
-
-    if item.business_owner_id:
-        item.pending_stage = "business_owner"
-    else:
-        item.pending_stage = "completed"
-        item.final_status = payload.action
 
-    db.commit()
+@router.post("/app-owner/action", dependencies=[action_budget])
+def app_owner_action(payload: schemas.StageActionInput, background_tasks: BackgroundTasks, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    _single_action(db, principal, "app_owner", payload, background_tasks)
     return {"message": "Application owner action recorded and staging updated"}
 
 
-@router.post("/business-owner/action")
-def business_owner_action(payload: schemas.StageActionInput, db: Session = Depends(get_db)):
-    item = db.query(models.ReviewItem).filter(models.ReviewItem.id == payload.review_item_id).first()
-    if not item:
-        raise HTTPException(404, "Review item not found")
-    if item.pending_stage != "business_owner":
-        raise HTTPException(400, "Item is not at Business Owner stage")
-    if item.business_owner_id != payload.actor_user_id:
-        raise HTTPException(403, "Not authorized for this item")
-
-    item.business_owner_action = payload.action
-    item.business_owner_comment = payload.comment
-    item.business_owner_timestamp = datetime.utcnow()
-
-    staging = db.query(models.StagingChange).filter(models.StagingChange.review_item_id == item.id, models.StagingChange.applied == False).first()
-
-    if payload.action.lower() in ("approve", "final_approve", "apply", "retain"):
-        if staging:
-            acc = db.query(models.Access).filter(models.Access.id == item.access_id).first()
-            if not acc:
-                raise HTTPException(500, "Access record missing")
-            if staging.proposed_action.lower() == "revoke":
-                acc.active = False
-                audit = models.AuditLog(review_item_id=item.id, action="applied_revoke", applied_by=payload.actor_user_id, details=staging.payload)
-                db.add(audit)
-            elif staging.proposed_action.lower() == "retain":
-                audit = models.AuditLog(review_item_id=item.id, action="applied_retain", applied_by=payload.actor_user_id, details=staging.payload)
-                db.add(audit)
-            elif staging.proposed_action.lower() == "modify":
-                import json as _json
-                try:
-                    payload_obj = _json.loads(staging.payload) if staging.payload else {}
-                except:
-                    payload_obj = {}
-                if payload_obj.get("new_user_id"):
-                    acc.user_id = int(payload_obj["new_user_id"])
-                    audit = models.AuditLog(review_item_id=item.id, action="applied_modify_transfer", applied_by=payload.actor_user_id, details=str(payload_obj))
-                    db.add(audit)
-                else:
-                    audit = models.AuditLog(review_item_id=item.id, action="applied_modify_noop", applied_by=payload.actor_user_id, details=staging.payload)
-                    db.add(audit)
-            else:
-                audit = models.AuditLog(review_item_id=item.id, action=f"applied_unknown_{staging.proposed_action}", applied_by=payload.actor_user_id, details=staging.payload)
-                db.add(audit)
-
-            staging.applied = True
-            staging.applied_at = datetime.utcnow()
-        else:
-            if payload.action.lower() in ("revoke",):
-                acc = db.query(models.Access).filter(models.Access.id == item.access_id).first()
-                if acc:
-                    acc.active = False
-                db.add(models.AuditLog(review_item_id=item.id, action="applied_direct_revoke", applied_by=payload.actor_user_id, details=payload.comment))
-            else:
-                db.add(models.AuditLog(review_item_id=item.id, action="applied_direct_retain", applied_by=payload.actor_user_id, details=payload.comment))
-
-        item.pending_stage = "completed"
-        item.final_status = payload.action
-        db.commit()
+@router.post("/business-owner/action", dependencies=[action_budget])
+def business_owner_action(payload: schemas.StageActionInput, background_tasks: BackgroundTasks, db: Session = Depends(get_db), principal: Optional[Principal] = Depends(current_principal)):
+    _single_action(db, principal, "business_owner", payload, background_tasks)
+    if payload.action.lower() in stage_actions.APPROVE_ACTIONS:
         return {"message": "Business owner approved and staging applied (if any)"}
-    else:
-        item.pending_stage = "completed"
-        item.final_status = payload.action
-        db.add(models.AuditLog(review_item_id=item.id, action="bo_rejected", applied_by=payload.actor_user_id, details=payload.comment))
-        db.commit()
-        return {"message": "Business owner rejected — staging NOT applied"}
+    return {"message": "Business owner rejected — staging NOT applied"}
+
+
+@router.post("/{stage_path}/actions:batch", response_model=schemas.BatchStageActionResult, dependencies=[action_budget])
+def batch_stage_action(
+    stage_path: str,
+    payload: schemas.BatchStageActionInput,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    principal: Optional[Principal] = Depends(current_principal),
+):
+    stage = stage_path.replace("-", "_")
+    if stage not in stage_actions.STAGES:
+        raise HTTPException(404, "Unknown stage")
+    authorize_actor(principal, payload.actor_user_id, stage)
+    if (payload.review_item_ids is None) == (payload.cycle_id is None):
+        raise HTTPException(400, "Provide either review_item_ids or cycle_id")
+    results = stage_actions.apply_stage_action(
+        db, stage, payload.actor_user_id, payload.action, payload.comment,
+        item_ids=payload.review_item_ids, cycle_id=payload.cycle_id,
+    )
+    db.commit()
+    _notify_handoffs(background_tasks, results)
+    processed = sum(1 for r in results if r["status"] == "ok")
+    return {"processed": processed, "failed": len(results) - processed, "results": results}
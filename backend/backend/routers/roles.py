@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from backend.db.database import get_db
 from backend.db import models, schemas
+from backend.utils.catalog_cache import catalog
+from backend.utils.streaming import ListParams
+from backend.utils.query_budget import route_budget
 
-router = APIRouter(prefix="/roles", tags=["Roles"])
+router = APIRouter(prefix="/roles", tags=["Roles"], dependencies=[route_budget(3)])
 
 @router.post("/", response_model=schemas.Role)
 def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
@@ -13,8 +17,9 @@ def create_role(role: schemas.RoleCreate, db: Session = Depends(get_db)):
     db.add(db_role)
     db.commit()
     db.refresh(db_role)
+    catalog.bump(models.Role)
     return db_role
 
 @router.get("/", response_model=list[schemas.Role])
-def list_roles(db: Session = Depends(get_db)):
-    return db.query(models.Role).all()
+def list_roles(request: Request, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return catalog.list_response(request, db, select(models.Role).order_by(models.Role.id), schemas.Role, params)
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from backend.db.database import get_db
 from backend.db import models, schemas
+from backend.utils.streaming import ListParams, list_response
+from backend.utils.query_budget import route_budget
+from backend.utils.session_tokens import revocations
 
-router = APIRouter(prefix="/user-roles", tags=["User Roles"])
+router = APIRouter(prefix="/user-roles", tags=["User Roles"], dependencies=[route_budget(6)])
 
 @router.post("/assign", response_model=schemas.UserRole)
 def assign_role(ur: schemas.UserRoleCreate, db: Session = Depends(get_db)):
@@ -18,10 +22,17 @@ def assign_role(ur: schemas.UserRoleCreate, db: Session = Depends(get_db)):
         raise HTTPException(400, "User already has this role")
     db_ur = models.UserRole(user_id=ur.user_id, role_id=ur.role_id)
     db.add(db_ur)
+    revocations.revoke(db, [ur.user_id], "role_assigned")
     db.commit()
     db.refresh(db_ur)
     return db_ur
 
 @router.get("/by-user/{user_id}", response_model=list[schemas.UserRole])
-def list_roles_for_user(user_id: int, db: Session = Depends(get_db)):
-    return db.query(models.UserRole).filter(models.UserRole.user_id == user_id).all()
+def list_roles_for_user(user_id: int, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    stmt = select(models.UserRole).where(models.UserRole.user_id == user_id).order_by(models.UserRole.id)
+    return list_response(db, stmt, schemas.UserRole, params)
+
+@router.get("/by-role/{role_id}", response_model=list[schemas.UserRole])
+def list_users_by_role(role_id: int, params: ListParams = Depends(), db: Session = Depends(get_db)):
+    stmt = select(models.UserRole).where(models.UserRole.role_id == role_id).order_by(models.UserRole.id)
+    return list_response(db, stmt, schemas.UserRole, params)
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from backend.db.database import get_db
 from backend.db import models, schemas
+from backend.utils.streaming import ListParams, list_response
+from backend.utils.query_budget import route_budget
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], dependencies=[route_budget(4)])
 
 @router.post("/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -18,5 +21,5 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.get("/", response_model=list[schemas.User])
-def list_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
+def list_users(params: ListParams = Depends(), db: Session = Depends(get_db)):
+    return list_response(db, select(models.User).order_by(models.User.id), schemas.User, params)
@@ -0,0 +1,103 @@
+import argparse
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.orm import Session
+from backend.db.database import SessionLocal
+from backend.db import models
+
+# per log table: (time column, {filter name: column}); each filter column leads an index ending in (time, id)
+SOURCES = {
+    "log": (models.AuditLog.applied_at, {
+        "cycle_id": models.AuditLog.cycle_id,
+        "review_item_id": models.AuditLog.review_item_id,
+        "actor_id": models.AuditLog.applied_by,
+        "action": models.AuditLog.action,
+    }),
+    "history": (models.ApprovalHistory.timestamp, {
+        "cycle_id": models.ApprovalHistory.cycle_id,
+        "review_item_id": models.ApprovalHistory.review_item_id,
+        "actor_id": models.ApprovalHistory.actor_id,
+        "action": models.ApprovalHistory.action,
+    }),
+}
+
+BACKFILL_CHUNK_SIZE = 10000
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    return f"{ts.isoformat()},{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    ts, row_id = cursor.rsplit(",", 1)
+    return datetime.fromisoformat(ts), int(row_id)
+
+
+def page_query(source: str, filters: dict, since: Optional[datetime], until: Optional[datetime], cursor: Optional[str], limit: int):
+    # newest first, keyset on (time, id); raises ValueError on a malformed cursor
+    time_col, columns = SOURCES[source]
+    model = time_col.class_
+    stmt = select(model)
+    for name, value in filters.items():
+        if value is not None:
+            stmt = stmt.where(columns[name] == value)
+    if since is not None:
+        stmt = stmt.where(time_col >= since)
+    if until is not None:
+        stmt = stmt.where(time_col < until)
+    if cursor:
+        stmt = stmt.where(tuple_(time_col, model.id) < tuple_(*decode_cursor(cursor)))
+    return stmt.order_by(time_col.desc(), model.id.desc()).limit(limit + 1)
+
+
+def page(rows: list, source: str, limit: int) -> dict:
+    time_col = SOURCES[source][0]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(getattr(last, time_col.key), last.id)
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+
+def backfill_cycle_ids(db: Session, chunk_size: int = BACKFILL_CHUNK_SIZE) -> dict:
+    # rows written before cycle_id was recorded; one commit per chunk
+    counts = {}
+    for time_col, _ in SOURCES.values():
+        model = time_col.class_
+        cycle_of = (
+            select(models.ReviewItem.cycle_id)
+            .where(models.ReviewItem.id == model.review_item_id)
+            .scalar_subquery()
+        )
+        total = last_id = 0
+        while True:
+            # keyset on id so rows whose review item is gone are passed over, not re-read
+            ids = db.execute(
+                select(model.id).where(model.cycle_id.is_(None), model.id > last_id).order_by(model.id).limit(chunk_size)
+            ).scalars().all()
+            if not ids:
+                break
+            last_id = ids[-1]
+            db.execute(update(model).where(model.id.in_(ids)).values(cycle_id=cycle_of).execution_options(synchronize_session=False))
+            db.commit()
+            total += len(ids)
+        counts[model.__tablename__] = total
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill cycle_id on audit_log / approval_history rows that predate it")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        counts = backfill_cycle_ids(db, args.chunk_size)
+    finally:
+        db.close()
+    for table, n in counts.items():
+        print(f"{table}: {n} rows backfilled")
+
+
+if __name__ == "__main__":
+    main()
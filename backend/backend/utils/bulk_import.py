@@ -0,0 +1,210 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import select
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models, schemas
+from backend.utils import catalog_cache, query_budget, reporting_closure
+from backend.utils.reviewer_resolver import resolver, MAP_MODELS
+from backend.utils.session_tokens import revocations
+
+KINDS = {
+    "users": (models.User, schemas.UserCreate),
+    "access": (models.Access, schemas.AccessCreate),
+    "reporting": (models.ReportingMap, schemas.ReportingMapCreate),
+    "reporting-app": (models.ReportingAppMap, schemas.ReportingAppMapCreate),
+    "app-manager": (models.AppManagerMap, schemas.AppManagerMapCreate),
+    "app-owner": (models.AppOwnerMap, schemas.AppOwnerMapCreate),
+    "business-owner": (models.BusinessOwnerMap, schemas.BusinessOwnerMapCreate),
+}
+
+FORMATS = ("csv", "ndjson")
+
+# mapping kinds that widen someone's reviewer scope: their session tokens are revoked
+REVIEWER_COLUMNS = {"reporting-app": "manager_id", "app-manager": "user_id", "app-owner": "user_id", "business-owner": "user_id"}
+
+# statements per flushed batch: the insert and, for mapping kinds, the token revocations
+STATEMENTS_PER_FLUSH = 2
+# clearing reporting_closure and inserting direct reports; each further level allows its own
+REBUILD_STATEMENTS = 2
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def _load_keys(db, kind: str) -> dict:
+    keys = {}
+    if kind == "users":
+        keys["business_user_ids"] = set(db.execute(select(models.User.business_user_id)).scalars())
+        keys["emails"] = set(db.execute(select(models.User.email)).scalars())
+        return keys
+    keys["user_ids"] = set(db.execute(select(models.User.id)).scalars())
+    if kind != "reporting":
+        keys["app_ids"] = set(db.execute(select(models.Application.id)).scalars())
+    if kind == "reporting":
+        keys["pairs"] = set(db.execute(select(models.ReportingMap.manager_id, models.ReportingMap.user_id)))
+        keys["managers"] = reporting_closure.first_managers(db)
+    elif kind == "reporting-app":
+        keys["pairs"] = set(db.execute(select(models.ReportingAppMap.manager_id, models.ReportingAppMap.app_id)))
+    return keys
+
+
+def _check(kind: str, obj, keys: dict):
+    if kind == "users":
+        if obj.business_user_id in keys["business_user_ids"]:
+            return "business_user_id already exists"
+        if obj.email in keys["emails"]:
+            return "email already exists"
+        keys["business_user_ids"].add(obj.business_user_id)
+        keys["emails"].add(obj.email)
+        return None
+    if kind == "access":
+        if obj.user_id not in keys["user_ids"]:
+            return "User not found"
+        if obj.application_id not in keys["app_ids"]:
+            return "Application not found"
+        return None
+    if kind in ("reporting", "reporting-app"):
+        target = obj.user_id if kind == "reporting" else obj.app_id
+        if obj.manager_id not in keys["user_ids"]:
+            return "Manager not found"
+        if kind == "reporting" and target not in keys["user_ids"]:
+            return "User not found"
+        if kind == "reporting-app" and target not in keys["app_ids"]:
+            return "Application not found"
+        if (obj.manager_id, target) in keys["pairs"]:
+            return "Mapping already exists"
+        # as POST /mappings/reporting: a user's first row makes their manager, and it may
+        # not close a loop, with the database or with earlier rows of the file
+        if kind == "reporting" and target not in keys["managers"]:
+            if reporting_closure.would_cycle(keys["managers"], target, obj.manager_id):
+                return "Mapping would make the user their own manager"
+            keys["managers"][target] = obj.manager_id
+        keys["pairs"].add((obj.manager_id, target))
+        return None
+    if obj.app_id not in keys["app_ids"]:
+        return "Application not found"
+    if obj.user_id not in keys["user_ids"]:
+        return "User not found"
+    return None
+
+
+def _read_rows(stream, format: str):
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_no, exc
+            continue
+        yield line_no, row
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def import_rows(kind: str, stream, format: str = "csv", dry_run: bool = False) -> dict:
+    model, schema = KINDS[kind]
+    table = model.__table__
+    batch_size = settings.IMPORT_BATCH_SIZE
+    now = datetime.utcnow()
+    report = {"kind": kind, "dry_run": dry_run, "rows_read": 0, "rows_inserted": 0, "rows_rejected": 0, "errors": [], "errors_truncated": False}
+
+    def reject(line_no, message):
+        report["rows_rejected"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_no, "error": message})
+        else:
+            report["errors_truncated"] = True
+
+    db = SessionLocal()
+    try:
+        keys = _load_keys(db, kind)
+        batch = []
+
+        def flush():
+            if not dry_run:
+                if report["rows_inserted"]:
+                    query_budget.allow(STATEMENTS_PER_FLUSH)
+                db.execute(table.insert(), batch)
+                if kind in REVIEWER_COLUMNS:
+                    revocations.revoke(db, {row[REVIEWER_COLUMNS[kind]] for row in batch}, "scope_changed")
+                db.commit()
+                report["rows_inserted"] += len(batch)
+            batch.clear()
+
+        for line_no, row in _read_rows(stream, format):
+            report["rows_read"] += 1
+            if isinstance(row, Exception):
+                reject(line_no, f"invalid JSON: {row}")
+                continue
+            if not isinstance(row, dict):
+                reject(line_no, "row must be an object")
+                continue
+            try:
+                obj = schema.model_validate(row)
+            except ValidationError as exc:
+                reject(line_no, _describe(exc))
+                continue
+            error = _check(kind, obj, keys)
+            if error:
+                reject(line_no, error)
+                continue
+
+            values = obj.model_dump()
+            if kind == "access":
+                values.update(active=True, created_at=now)
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        # committed batches stand even if a later one failed. Rows can add managers above
+        # and below earlier ones, so the hierarchy is recomputed once, not row by row.
+        if kind == "reporting" and report["rows_inserted"]:
+            db.rollback()
+            query_budget.allow(REBUILD_STATEMENTS)
+            reporting_closure.rebuild(db)
+            db.commit()
+        if model in MAP_MODELS and report["rows_inserted"]:
+            resolver.invalidate()
+        if model in catalog_cache.MODELS and report["rows_inserted"]:
+            catalog_cache.catalog.bump(model)
+        db.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users, accesses and mappings")
+    parser.add_argument("kind", choices=list(KINDS))
+    parser.add_argument("path", help="CSV or NDJSON file, '-' for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    args = parser.parse_args()
+
+    format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        report = import_rows(args.kind, stream, format, args.dry_run)
+    else:
+        with open(args.path, encoding="utf-8", newline="") as stream:
+            report = import_rows(args.kind, stream, format, args.dry_run)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    sys.exit(1 if report["rows_rejected"] else 0)
+
+
+if __name__ == "__main__":
+    main()
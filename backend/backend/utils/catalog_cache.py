@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db import models
+from backend.utils.streaming import ListParams, list_response
+
+# small, rarely written tables the frontend reloads on every page
+MODELS = (
+    models.Role, models.Application,
+    models.ReportingMap, models.ReportingAppMap, models.AppManagerMap, models.AppOwnerMap, models.BusinessOwnerMap,
+)
+
+MAX_ENTRIES = 256
+
+
+class _Entry:
+    __slots__ = ("version", "etag", "body", "loaded_at")
+
+    def __init__(self, version: int, etag: str, body: bytes, loaded_at: float):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.loaded_at = loaded_at
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison: W/"x" and "x" are the same validator
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class CatalogCache:
+    # serialized list bodies per (table, query string), valid while the table's version
+    # counter is unchanged. Writes in this process bump the counter (bump()); writes from
+    # other processes are picked up when an entry outlives the TTL and its rebuilt body
+    # differs. ETags carry a per-process token, so another worker's version numbers can
+    # never produce a false 304.
+
+    def __init__(self, ttl_seconds: int, max_entries: int = MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._token = f"{os.getpid():x}{time.time_ns() & 0xFFFFFF:06x}"
+        self._versions = {m.__tablename__: 0 for m in MODELS}
+        self._entries = OrderedDict()
+
+    def bump(self, model) -> None:
+        # call after the write has committed
+        with self._lock:
+            self._versions[model.__tablename__] += 1
+
+    def _etag(self, table: str, version: int) -> str:
+        return f'W/"{table}-{self._token}-{version}"'
+
+    def _lookup(self, key: tuple):
+        with self._lock:
+            version = self._versions[key[0]]
+            entry = self._entries.get(key)
+            fresh = entry is not None and entry.version == version and time.monotonic() - entry.loaded_at < self.ttl_seconds
+            if fresh:
+                self._entries.move_to_end(key)
+            return version, entry, fresh
+
+    def _store(self, key: tuple, version: int, stale, body: bytes) -> _Entry:
+        table = key[0]
+        with self._lock:
+            if stale is not None and stale.version == version and stale.body != body and self._versions[table] == version:
+                # expired by TTL and changed underneath: another process wrote the table
+                self._versions[table] = version = version + 1
+            if stale is not None and stale.body == body and stale.version == version:
+                etag = stale.etag
+            else:
+                etag = self._etag(table, version)
+            entry = _Entry(version, etag, body, time.monotonic())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def list_response(self, request: Request, db: Session, stmt, schema, params: ListParams):
+        if params.format is not None:
+            return list_response(db, stmt, schema, params)
+        key = (stmt.column_descriptions[0]["entity"].__tablename__, request.url.query)
+        version, entry, fresh = self._lookup(key)
+        if not fresh:
+            # the version is read before the query, so a write committed meanwhile
+            # leaves this entry already out of date rather than hiding the write
+            rows = db.scalars(stmt.offset(params.offset).limit(params.limit)).all()
+            adapter = TypeAdapter(list[schema])
+            entry = self._store(key, version, entry, adapter.dump_json(adapter.validate_python(rows, from_attributes=True)))
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+
+catalog = CatalogCache(settings.CATALOG_CACHE_TTL_SECONDS)
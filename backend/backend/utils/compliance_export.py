@@ -0,0 +1,287 @@
+import argparse
+import csv
+import gzip
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, update, and_
+from sqlalchemy.orm import Session, aliased
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import stage_actions
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "parquet")
+
+MANIFEST = "manifest.json"
+
+_item, _access, _user, _app, _cycle = models.ReviewItem, models.Access, models.User, models.Application, models.ReviewCycle
+
+# (column name, expression, kind); kind picks the parquet type and csv rendering
+EXPORT_COLUMNS = [
+    ("review_item_id", _item.id, "int"),
+    ("cycle_id", _item.cycle_id, "int"),
+    ("quarter", _cycle.quarter, "str"),
+    ("access_id", _item.access_id, "int"),
+    ("access_active", _access.active, "bool"),
+    ("user_id", _access.user_id, "int"),
+    ("business_user_id", _user.business_user_id, "str"),
+    ("user_name", _user.name, "str"),
+    ("user_email", _user.email, "str"),
+    ("application_id", _access.application_id, "int"),
+    ("application_name", _app.name, "str"),
+]
+# one stage_decision alias per stage, outer-joined on its primary key
+_decisions = {stage: aliased(models.StageDecision, name=f"{stage}_decision") for stage in stage_actions.STAGES}
+for _stage, _decision in _decisions.items():
+    EXPORT_COLUMNS += [
+        (f"{_stage}_id", stage_actions.REVIEWER_COLUMNS[_stage], "int"),
+        (f"{_stage}_action", _decision.action, "str"),
+        (f"{_stage}_comment", _decision.comment, "str"),
+        (f"{_stage}_timestamp", _decision.decided_at, "timestamp"),
+    ]
+EXPORT_COLUMNS += [
+    ("pending_stage", _item.pending_stage, "str"),
+    ("final_status", _item.final_status, "str"),
+]
+
+
+def available_formats() -> tuple:
+    return tuple(f for f in FORMATS if f != "parquet" or importlib.util.find_spec("pyarrow"))
+
+
+def export_query(cycle_id: int):
+    # outer joins: an item whose access row was deleted is still part of the record
+    stmt = (
+        select(*[expr for _, expr, _ in EXPORT_COLUMNS])
+        .select_from(_item)
+        .join(_cycle, _cycle.id == _item.cycle_id)
+        .outerjoin(_access, _access.id == _item.access_id)
+        .outerjoin(_user, _user.id == _access.user_id)
+        .outerjoin(_app, _app.id == _access.application_id)
+    )
+    for stage, decision in _decisions.items():
+        stmt = stmt.outerjoin(decision, and_(decision.review_item_id == _item.id, decision.stage == stage))
+    return stmt.where(_item.cycle_id == cycle_id).order_by(_item.id)
+
+
+class _CsvWriter:
+    filename = "decisions.csv.gz"
+
+    def __init__(self, path: str):
+        self._file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow([name for name, _, _ in EXPORT_COLUMNS])
+        self._timestamps = [i for i, (_, _, kind) in enumerate(EXPORT_COLUMNS) if kind == "timestamp"]
+
+    def write(self, rows) -> None:
+        out = []
+        for row in rows:
+            row = list(row)
+            for i in self._timestamps:
+                if row[i] is not None:
+                    row[i] = row[i].isoformat()
+            out.append(row)
+        self._csv.writerows(out)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    filename = "decisions.parquet"
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("parquet export needs pyarrow (pip install pyarrow)")
+        self._pa = pyarrow
+        types = {"int": pyarrow.int64(), "str": pyarrow.string(), "bool": pyarrow.bool_(), "timestamp": pyarrow.timestamp("us")}
+        self._schema = pyarrow.schema([(name, types[kind]) for name, _, kind in EXPORT_COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, rows) -> None:
+        # one row group per batch
+        columns = list(zip(*rows))
+        arrays = [self._pa.array(values, type=field.type) for values, field in zip(columns, self._schema)]
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_cycle(db: Session, cycle_id: int, formats=("csv",), out_dir: Optional[str] = None, on_batch=None) -> dict:
+    # one SELECT streamed in yield_per batches, each written to every format, so memory
+    # stays at one batch whatever the cycle size; the manifest is written last
+    cycle = db.get(models.ReviewCycle, cycle_id)
+    if cycle is None:
+        raise ValueError(f"cycle {cycle_id} not found")
+    generated_at = datetime.utcnow()
+    path = os.path.join(out_dir or settings.EXPORT_DIR, f"cycle-{cycle_id}-{generated_at:%Y%m%dT%H%M%S%f}")
+    os.makedirs(path, exist_ok=True)
+
+    writers = {}
+    rows = 0
+    try:
+        for fmt in dict.fromkeys(formats):
+            writers[fmt] = WRITERS[fmt](os.path.join(path, WRITERS[fmt].filename + ".part"))
+        result = db.execute(export_query(cycle_id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            for writer in writers.values():
+                writer.write(batch)
+            rows += len(batch)
+            if on_batch:
+                on_batch(rows)
+    except BaseException:
+        for fmt, writer in writers.items():
+            writer.close()
+            os.remove(os.path.join(path, WRITERS[fmt].filename + ".part"))
+        os.rmdir(path)
+        raise
+
+    files = []
+    for fmt, writer in writers.items():
+        writer.close()
+        name = WRITERS[fmt].filename
+        os.replace(os.path.join(path, name + ".part"), os.path.join(path, name))
+        files.append({"name": name, "format": fmt, "bytes": os.path.getsize(os.path.join(path, name)), "sha256": _sha256(os.path.join(path, name))})
+
+    manifest = {
+        "cycle_id": cycle_id,
+        "quarter": cycle.quarter,
+        "generated_at": generated_at.isoformat(),
+        "rows": rows,
+        "columns": [name for name, _, _ in EXPORT_COLUMNS],
+        "files": files,
+    }
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    manifest["path"] = path
+    return manifest
+
+
+def read_manifest(job: models.ExportJob) -> Optional[dict]:
+    if job.status != "completed" or not job.path:
+        return None
+    try:
+        with open(os.path.join(job.path, MANIFEST)) as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def job_view(job: models.ExportJob) -> dict:
+    return {
+        "id": job.id,
+        "cycle_id": job.cycle_id,
+        "formats": job.formats,
+        "status": job.status,
+        "rows_done": job.rows_done,
+        "path": job.path,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "manifest": read_manifest(job),
+    }
+
+
+def enqueue_export(db: Session, cycle_id: int, formats) -> models.ExportJob:
+    job = models.ExportJob(cycle_id=cycle_id, formats=",".join(formats), status="queued")
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def run_export_job(job_id: int) -> None:
+    db = SessionLocal()
+    status_db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(models.ExportJob)
+            .where(models.ExportJob.id == job_id, models.ExportJob.status == "queued")
+            .values(status="running", started_at=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return
+        job = db.get(models.ExportJob, job_id)
+
+        def on_batch(rows):
+            # progress goes through its own session; db is busy streaming the export
+            status_db.execute(update(models.ExportJob).where(models.ExportJob.id == job_id).values(rows_done=rows))
+            status_db.commit()
+
+        manifest = export_cycle(db, job.cycle_id, job.formats.split(","), on_batch=on_batch)
+        db.rollback()
+        db.execute(
+            update(models.ExportJob).where(models.ExportJob.id == job_id)
+            .values(status="completed", rows_done=manifest["rows"], path=manifest["path"], finished_at=datetime.utcnow())
+        )
+        db.commit()
+    except Exception as exc:
+        logger.exception("export job %s failed", job_id)
+        db.rollback()
+        db.execute(update(models.ExportJob).where(models.ExportJob.id == job_id).values(status="failed", error=str(exc), finished_at=datetime.utcnow()))
+        db.commit()
+    finally:
+        status_db.close()
+        db.close()
+
+
+def run_pending_exports() -> int:
+    db = SessionLocal()
+    try:
+        job_ids = db.execute(select(models.ExportJob.id).where(models.ExportJob.status == "queued").order_by(models.ExportJob.id)).scalars().all()
+    finally:
+        db.close()
+    for job_id in job_ids:
+        run_export_job(job_id)
+    return len(job_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a review cycle's decisions as gzip CSV / Parquet with a checksum manifest")
+    parser.add_argument("cycle_id", type=int, nargs="?", help="export this cycle now")
+    parser.add_argument("--format", action="append", choices=FORMATS, help="repeatable (default: csv)")
+    parser.add_argument("--out", help=f"output directory (default: EXPORT_DIR={settings.EXPORT_DIR})")
+    parser.add_argument("--jobs", action="store_true", help="run queued export jobs and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.jobs:
+        logger.info("ran %s export job(s)", run_pending_exports())
+        return
+    if args.cycle_id is None:
+        parser.error("cycle_id or --jobs is required")
+    db = SessionLocal()
+    try:
+        manifest = export_cycle(db, args.cycle_id, args.format or ["csv"], args.out)
+    finally:
+        db.close()
+    json.dump(manifest, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, insert, update, union, func, and_, or_, not_, literal
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import cycle_summary, notifications, query_budget
+from backend.utils.reviewer_resolver import resolver
+from backend.utils.stage_actions import STAGES, plan, routed, stage_orders
+
+logger = logging.getLogger(__name__)
+
+
+def generate_items(db: Session, cycle_id: int, after_id: Optional[int] = None, upto_id: Optional[int] = None) -> int:
+    maps = resolver.maps(db, verify=True)
+    orders = stage_orders(db)
+    stmt = (
+        select(models.Access.id, models.Access.user_id, models.Access.application_id)
+        .where(models.Access.active == True)
+        .order_by(models.Access.id)
+        .execution_options(yield_per=settings.CYCLE_JOB_CHUNK_SIZE)
+    )
+    if after_id is not None:
+        stmt = stmt.where(models.Access.id > after_id)
+    if upto_id is not None:
+        stmt = stmt.where(models.Access.id <= upto_id)
+
+    table = models.ReviewItem.__table__
+    inserted = 0
+    counts = Counter()
+    for i, batch in enumerate(db.execute(stmt).partitions()):
+        if i:
+            query_budget.allow()
+        rows = []
+        for access_id, user_id, app_id in batch:
+            order = orders.get(app_id)
+            reviewers = routed(maps.reviewers(user_id, app_id), order)
+            stage, chain = plan(reviewers, order)
+            reviewer_id = reviewers[STAGES.index(stage)] if stage != "completed" else None
+            counts[(cycle_id, stage, reviewer_id, None)] += 1
+            rows.append({
+                "cycle_id": cycle_id,
+                "access_id": access_id,
+                "reporting_manager_id": reviewers[0],
+                "app_manager_id": reviewers[1],
+                "app_owner_id": reviewers[2],
+                "business_owner_id": reviewers[3],
+                "pending_stage": stage,
+                "stage_chain": chain,
+            })
+        db.execute(table.insert(), rows)
+        inserted += len(rows)
+    cycle_summary.apply_deltas(db, counts)
+    return inserted
+
+
+# copied as-is from the base item when a decision is carried forward
+CARRIED_COLUMNS = [
+    "reporting_manager_id", "app_manager_id", "app_owner_id", "business_owner_id", "pending_stage", "stage_chain",
+    "final_status",
+]
+
+
+def _changed_since(base, since: datetime):
+    # accesses that may need a fresh review: new, transferred, or touched by a mapping written after the base cycle
+    changed_users = select(models.ReportingMap.user_id).where(models.ReportingMap.created_at > since)
+    changed_apps = union(*[
+        select(m.app_id).where(m.created_at > since)
+        for m in (models.ReportingAppMap, models.AppManagerMap, models.AppOwnerMap, models.BusinessOwnerMap)
+    ])
+    transferred = (
+        select(models.ReviewItem.access_id)
+        .join(models.AuditLog, models.AuditLog.review_item_id == models.ReviewItem.id)
+        .where(models.AuditLog.action == "applied_modify_transfer", models.AuditLog.applied_at > since)
+    )
+    is_transferred = models.Access.id.in_(transferred)
+    changed = or_(
+        base.id.is_(None),
+        base.pending_stage != "completed",
+        and_(models.Access.created_at.isnot(None), models.Access.created_at > since),
+        models.Access.user_id.in_(changed_users),
+        models.Access.application_id.in_(changed_apps),
+        is_transferred,
+    )
+    return changed, is_transferred
+
+
+def _carry_forward(db: Session, cycle_id: int, base, where) -> int:
+    base_cols = [base.c[name] for name in CARRIED_COLUMNS]
+    stmt = (
+        select(literal(cycle_id), base.c.access_id, *base_cols, base.c.final_status, base.c.id)
+        .select_from(base)
+        .join(models.Access, models.Access.id == base.c.access_id)
+        .where(models.Access.active == True, where)
+    )
+    columns = ["cycle_id", "access_id", *CARRIED_COLUMNS, "suggested_action", "carried_from_id"]
+    return db.execute(insert(models.ReviewItem).from_select(columns, stmt)).rowcount
+
+
+def _carry_decisions(db: Session, cycle_id: int) -> None:
+    # the carried items' stage decisions, under their new ids
+    item, decision = models.ReviewItem, models.StageDecision
+    stmt = (
+        select(item.id, decision.stage, decision.action, decision.comment, decision.decided_at)
+        .join(decision, decision.review_item_id == item.carried_from_id)
+        .where(item.cycle_id == cycle_id, item.carried_from_id.isnot(None))
+    )
+    db.execute(insert(decision).from_select(["review_item_id", "stage", "action", "comment", "decided_at"], stmt))
+
+
+def generate_delta(db: Session, cycle_id: int, base_cycle: models.ReviewCycle) -> dict:
+    maps = resolver.maps(db, verify=True)
+    orders = stage_orders(db)
+    base = models.ReviewItem.__table__.alias("base")
+    changed, is_transferred = _changed_since(base.c, base_cycle.created_at)
+    on_base = and_(base.c.access_id == models.Access.id, base.c.cycle_id == base_cycle.id)
+
+    # unchanged accesses never leave the database
+    carried = _carry_forward(db, cycle_id, base, and_(base.c.cycle_id == base_cycle.id, not_(changed)))
+
+    candidates = (
+        select(
+            models.Access.id, models.Access.user_id, models.Access.application_id,
+            base.c.id, base.c.pending_stage, base.c.final_status, is_transferred,
+            base.c.reporting_manager_id, base.c.app_manager_id, base.c.app_owner_id, base.c.business_owner_id,
+        )
+        .select_from(models.Access)
+        .outerjoin(base, on_base)
+        .where(models.Access.active == True, changed)
+        .order_by(models.Access.id)
+    )
+    fresh, unchanged = [], []
+    for access_id, user_id, app_id, base_id, base_stage, base_status, transferred, *base_reviewers in db.execute(candidates):
+        order = orders.get(app_id)
+        reviewers = routed(maps.reviewers(user_id, app_id), order)
+        decided = base_id is not None and base_stage == "completed"
+        if decided and not transferred and tuple(base_reviewers) == reviewers:
+            unchanged.append(base_id)
+            continue
+        stage, chain = plan(reviewers, order)
+        fresh.append({
+            "cycle_id": cycle_id,
+            "access_id": access_id,
+            "reporting_manager_id": reviewers[0],
+            "app_manager_id": reviewers[1],
+            "app_owner_id": reviewers[2],
+            "business_owner_id": reviewers[3],
+            "pending_stage": stage,
+            "stage_chain": chain,
+            "suggested_action": base_status if decided else None,
+        })
+
+    for i in range(0, len(unchanged), 500):
+        if i:
+            query_budget.allow()
+        carried += _carry_forward(db, cycle_id, base, base.c.id.in_(unchanged[i:i + 500]))
+    _carry_decisions(db, cycle_id)
+    if fresh:
+        db.execute(models.ReviewItem.__table__.insert(), fresh)
+    cycle_summary.rebuild(db, cycle_id)
+    return {"fresh": len(fresh), "carried": carried}
+
+
+def enqueue_job(db: Session, cycle_id: int) -> models.CycleJob:
+    total = db.query(func.count(models.Access.id)).filter(models.Access.active == True).scalar()
+    job = models.CycleJob(cycle_id=cycle_id, status="queued", rows_total=total)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _claimable():
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.CYCLE_JOB_STALE_SECONDS)
+    return or_(
+        models.CycleJob.status == "queued",
+        and_(models.CycleJob.status == "running", models.CycleJob.heartbeat_at < stale_before),
+    )
+
+
+def _claim(db: Session, job_id: int) -> bool:
+    now = datetime.utcnow()
+    claimed = db.execute(
+        update(models.CycleJob)
+        .where(models.CycleJob.id == job_id, _claimable())
+        .values(status="running", started_at=now, heartbeat_at=now, rows_at_start=models.CycleJob.rows_done)
+    ).rowcount
+    db.commit()
+    return claimed == 1
+
+
+def run_job(job_id: int, chunk_size: Optional[int] = None) -> None:
+    chunk_size = chunk_size or settings.CYCLE_JOB_CHUNK_SIZE
+    db = SessionLocal()
+    try:
+        if not _claim(db, job_id):
+            return
+        job = db.get(models.CycleJob, job_id)
+        while True:
+            upto_id = db.execute(
+                select(models.Access.id)
+                .where(models.Access.active == True, models.Access.id > job.last_access_id)
+                .order_by(models.Access.id)
+                .offset(chunk_size - 1)
+                .limit(1)
+            ).scalar()
+            # the chunk and its checkpoint commit together, so a crash never double-inserts
+            job.rows_done += generate_items(db, job.cycle_id, after_id=job.last_access_id, upto_id=upto_id)
+            job.heartbeat_at = datetime.utcnow()
+            if upto_id is None:
+                break
+            job.last_access_id = upto_id
+            db.commit()
+
+        job.status = "completed"
+        job.finished_at = job.heartbeat_at
+        db.query(models.ReviewCycle).filter(models.ReviewCycle.id == job.cycle_id).update({"status": "in_progress"})
+        notifications.mark_cycle(db, job.cycle_id)
+        db.commit()
+        notifications.send_pending()
+    except Exception as exc:
+        logger.exception("cycle job %s failed", job_id)
+        db.rollback()
+        db.query(models.CycleJob).filter(models.CycleJob.id == job_id).update({"status": "failed", "error": str(exc)})
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_pending_jobs() -> int:
+    db = SessionLocal()
+    try:
+        job_ids = db.execute(select(models.CycleJob.id).where(_claimable()).order_by(models.CycleJob.id)).scalars().all()
+    finally:
+        db.close()
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
+
+
+def progress(job: models.CycleJob) -> dict:
+    rows_per_second = None
+    if job.started_at and job.heartbeat_at and job.heartbeat_at > job.started_at:
+        elapsed = (job.heartbeat_at - job.started_at).total_seconds()
+        rows_per_second = round((job.rows_done - job.rows_at_start) / elapsed, 1)
+    return {
+        "job_id": job.id,
+        "cycle_id": job.cycle_id,
+        "status": job.status,
+        "rows_done": job.rows_done,
+        "rows_total": job.rows_total,
+        "rows_left": max(job.rows_total - job.rows_done, 0),
+        "rows_per_second": rows_per_second,
+        "started_at": job.started_at,
+        "updated_at": job.heartbeat_at,
+        "error": job.error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review cycle generation worker")
+    parser.add_argument("--once", action="store_true", help="drain pending jobs and exit")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between polls")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        ran = run_pending_jobs()
+        if args.once:
+            break
+        if not ran:
+            time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+from collections import Counter
+from sqlalchemy import select, insert, delete, func, case
+from sqlalchemy.orm import Session
+from backend.db.database import SessionLocal, upsert
+from backend.db import models
+from backend.utils import stage_actions
+
+summary_table = models.CycleStageSummary.__table__
+SUMMARY_KEY = list(next(ix for ix in summary_table.indexes if ix.name == "ix_cycle_stage_summary_key").expressions)
+
+
+def apply_deltas(db: Session, deltas: Counter) -> None:
+    # deltas are keyed (cycle_id, stage, reviewer_id, final_status); applied in the
+    # caller's transaction, next to the review_item writes they account for, as one
+    # upsert so concurrent writers add to the same row
+    rows = [
+        {"cycle_id": cycle_id, "stage": stage, "reviewer_id": reviewer_id, "final_status": final_status, "item_count": delta}
+        for (cycle_id, stage, reviewer_id, final_status), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    stmt = upsert(db, summary_table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=SUMMARY_KEY,
+        set_={"item_count": summary_table.c.item_count + stmt.excluded.item_count},
+    )
+    db.execute(stmt, rows)
+
+
+def has_duplicate_keys(db) -> bool:
+    return db.execute(select(func.count()).select_from(summary_table).group_by(*SUMMARY_KEY).having(func.count() > 1).limit(1)).first() is not None
+
+
+def rebuild(db: Session, cycle_id=None) -> int:
+    item = models.ReviewItem
+    reviewer_id = case(*[(item.pending_stage == stage, col) for stage, col in stage_actions.REVIEWER_COLUMNS.items()], else_=None)
+    counts = (
+        select(item.cycle_id, item.pending_stage, reviewer_id, item.final_status, func.count())
+        .group_by(item.cycle_id, item.pending_stage, reviewer_id, item.final_status)
+    )
+    clear = delete(summary_table)
+    if cycle_id is not None:
+        counts = counts.where(item.cycle_id == cycle_id)
+        clear = clear.where(summary_table.c.cycle_id == cycle_id)
+    db.execute(clear)
+    return db.execute(
+        insert(summary_table).from_select(["cycle_id", "stage", "reviewer_id", "final_status", "item_count"], counts)
+    ).rowcount
+
+
+def summarize(cycle_id: int, rows) -> dict:
+    by_stage, by_status = Counter(), Counter()
+    by_reviewer = []
+    for stage, reviewer_id, final_status, count in rows:
+        by_stage[stage] += count
+        by_status[final_status] += count
+        if reviewer_id is not None and stage != "completed":
+            by_reviewer.append({"stage": stage, "reviewer_id": reviewer_id, "count": count})
+    by_reviewer.sort(key=lambda r: (stage_actions.STAGES.index(r["stage"]), r["reviewer_id"]))
+    return {
+        "cycle_id": cycle_id,
+        "total": sum(by_stage.values()),
+        "by_stage": dict(by_stage),
+        "by_reviewer": by_reviewer,
+        "by_final_status": [{"final_status": s, "count": n} for s, n in by_status.items()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute cycle_stage_summary from review_item")
+    parser.add_argument("--cycle-id", type=int, help="only this cycle (default: all cycles)")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        rows = rebuild(db, args.cycle_id)
+        db.commit()
+    finally:
+        db.close()
+    print(f"rebuilt cycle_stage_summary: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,19 @@
-from backend.config import settings
-def send_email(to_email: str, subject: str, body: str):
-    print(f"MOCK EMAIL -> To: {to_email}\nSubject: {subject}\n{body}\n----")
+from typing import Optional
+from sqlalchemy.orm import Session
+from backend.db.database import SessionLocal
+from backend.db import models
+
+def send_email(to_email: str, subject: str, body: str, db: Optional[Session] = None):
+    # enqueue only; backend.utils.mail_worker delivers. Pass db to commit with the caller's transaction.
+    message = models.NotificationOutbox(to_email=to_email, subject=subject, body=body)
+    if db is not None:
+        db.add(message)
+        return message
+    db = SessionLocal()
+    try:
+        db.add(message)
+        db.commit()
+        db.refresh(message)
+        return message
+    finally:
+        db.close()
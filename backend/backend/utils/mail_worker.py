@@ -0,0 +1,182 @@
+import argparse
+import logging
+import queue
+import random
+import smtplib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+from email.message import EmailMessage
+from sqlalchemy import select, update, or_, and_, bindparam
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models
+
+logger = logging.getLogger(__name__)
+
+outbox = models.NotificationOutbox.__table__
+
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+# fixed set of reusable SMTP connections; its size is the delivery concurrency limit
+class SMTPPool:
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+        if settings.SMTP_STARTTLS:
+            conn.starttls()
+        if settings.SMTP_USER:
+            conn.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return conn
+
+    def send(self, message: EmailMessage) -> None:
+        conn = self._idle.get()
+        try:
+            if conn is None:
+                conn = self._connect()
+            try:
+                conn.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # the relay dropped an idle connection; retry once on a fresh one
+                self._discard(conn)
+                conn = None
+                conn = self._connect()
+                conn.send_message(message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # rejected message; the connection itself is still usable
+            raise
+        except Exception:
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def _discard(self, conn) -> None:
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        for _ in range(self.size):
+            self._discard(self._idle.get())
+
+
+def _build(row) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_FROM
+    message["To"] = row.to_email
+    message["Subject"] = row.subject
+    message.set_content(row.body)
+    return message
+
+
+def _claim(db: Session, limit: int) -> list:
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+    claimable = or_(
+        and_(outbox.c.status == "pending", outbox.c.next_attempt_at <= now),
+        and_(outbox.c.status == "sending", outbox.c.claimed_at < stale_before),
+    )
+    token = uuid.uuid4().hex
+    ids = select(outbox.c.id).where(claimable).order_by(outbox.c.next_attempt_at, outbox.c.id).limit(limit).scalar_subquery()
+    db.execute(
+        update(outbox).where(outbox.c.id.in_(ids), claimable).values(status="sending", claim_token=token, claimed_at=now)
+    )
+    db.commit()
+    return db.execute(select(outbox).where(outbox.c.claim_token == token, outbox.c.status == "sending")).all()
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _permanent(exc: Exception) -> bool:
+    return isinstance(exc, smtplib.SMTPRecipientsRefused) or (
+        isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+    )
+
+
+def deliver_batch(db: Session, pool: SMTPPool, executor: ThreadPoolExecutor, limit: Optional[int] = None) -> dict:
+    rows = _claim(db, limit or settings.OUTBOX_BATCH_SIZE)
+    if not rows:
+        return {"claimed": 0, "sent": 0, "retry": 0, "dead": 0}
+
+    def attempt(row):
+        try:
+            pool.send(_build(row))
+            return row, None
+        except Exception as exc:
+            return row, exc
+
+    now = datetime.utcnow()
+    sent, retry, dead = [], [], []
+    for row, exc in executor.map(attempt, rows):
+        if exc is None:
+            sent.append({"b_id": row.id})
+            continue
+        attempts = row.attempts + 1
+        error = f"{type(exc).__name__}: {exc}"[:1000]
+        if _permanent(exc) or attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            dead.append({"b_id": row.id, "attempts": attempts, "last_error": error})
+            logger.warning("outbox %s dead after %s attempt(s): %s", row.id, attempts, error)
+        else:
+            retry.append({"b_id": row.id, "attempts": attempts, "last_error": error, "next_attempt_at": now + _backoff(attempts)})
+
+    by_id = outbox.c.id == bindparam("b_id")
+    if sent:
+        db.execute(update(outbox).where(by_id).values(status="sent", sent_at=now, claim_token=None), sent)
+    if retry:
+        db.execute(update(outbox).where(by_id).values(status="pending", claim_token=None), retry)
+    if dead:
+        db.execute(update(outbox).where(by_id).values(status="dead", claim_token=None), dead)
+    db.commit()
+    return {"claimed": len(rows), "sent": len(sent), "retry": len(retry), "dead": len(dead)}
+
+
+def drain(pool_size: Optional[int] = None, poll: Optional[float] = None) -> dict:
+    # poll=None: deliver until nothing is due, then return
+    pool = SMTPPool(pool_size or settings.SMTP_POOL_SIZE)
+    totals = {"claimed": 0, "sent": 0, "retry": 0, "dead": 0}
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            while True:
+                result = deliver_batch(db, pool, executor)
+                for key, value in result.items():
+                    totals[key] += value
+                if result["claimed"]:
+                    continue
+                if poll is None:
+                    return totals
+                time.sleep(poll)
+    finally:
+        db.close()
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued notification_outbox emails over SMTP")
+    parser.add_argument("--once", action="store_true", help="drain due messages and exit")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between polls")
+    parser.add_argument("--pool-size", type=int, help="SMTP connections / concurrent sends")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    totals = drain(args.pool_size, None if args.once else args.poll)
+    logger.info("outbox drained: %s", totals)
+
+
+if __name__ == "__main__":
+    main()
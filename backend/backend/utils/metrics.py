@@ -0,0 +1,247 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from backend.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "rows", "statements", "budget", "allowance")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        # statement text, recorded only while query budgets are enforced (query_budget)
+        self.statements = None
+        self.budget = None
+        self.allowance = 0
+
+    def copy(self) -> "RequestStats":
+        other = RequestStats()
+        other.queries, other.sql_seconds, other.rows = self.queries, self.sql_seconds, self.rows
+        return other
+
+
+# set for the duration of a request; None for jobs and CLIs, which are not measured
+current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class _RouteMetrics:
+    __slots__ = ("latency", "queries", "statuses", "sql_seconds", "rows")
+
+    def __init__(self):
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.statuses = {}
+        self.sql_seconds = 0.0
+        self.rows = 0
+
+
+_lock = threading.Lock()
+_routes = {}
+
+
+def record(method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+    with _lock:
+        m = _routes.get((method, route))
+        if m is None:
+            m = _routes[(method, route)] = _RouteMetrics()
+        m.latency.observe(seconds)
+        m.queries.observe(stats.queries)
+        m.statuses[status] = m.statuses.get(status, 0) + 1
+        m.sql_seconds += stats.sql_seconds
+        m.rows += stats.rows
+
+
+def reset() -> None:
+    with _lock:
+        _routes.clear()
+
+
+def _histogram_lines(name: str, labels: str, h: _Histogram) -> list:
+    lines, cumulative = [], 0
+    for bound, n in zip(h.buckets, h.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+    lines.append(f"{name}_sum{{{labels}}} {h.total}")
+    lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return lines
+
+
+def render() -> str:
+    # Prometheus text exposition format 0.0.4
+    with _lock:
+        routes = sorted(_routes.items())
+        lines = [
+            "# HELP http_requests_total Requests by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), m in routes:
+            for status, n in sorted(m.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {n}')
+        sections = [
+            ("http_request_duration_seconds", "Request latency.", lambda m: m.latency),
+            ("http_request_db_queries", "SQL statements executed per request.", lambda m: m.queries),
+        ]
+        for name, help_text, pick in sections:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (method, route), m in routes:
+                lines += _histogram_lines(name, f'method="{method}",route="{route}"', pick(m))
+        counters = [
+            ("http_request_db_seconds_total", "Time spent executing SQL.", lambda m: m.sql_seconds),
+            ("http_request_db_rows_total", "Rows fetched from SQL results.", lambda m: m.rows),
+        ]
+        for name, help_text, pick in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route), m in routes:
+                lines.append(f'{name}{{method="{method}",route="{route}"}} {pick(m)}')
+    return "\n".join(lines) + "\n"
+
+
+class _CountingCursor:
+    # stands in for the DB-API cursor a result reads from, counting fetched rows
+    __slots__ = ("_cursor", "_stats")
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Dialect-level hooks rather than before/after_cursor_execute: connection events
+# switch on SQLAlchemy's per-statement event dispatch, which costs more than a
+# small SQLite query, while these run only around the DB-API call itself.
+# Returning None lets the dialect execute as usual; outside a request that is all
+# that happens.
+
+def _timed(stats: RequestStats, statement: str, run) -> bool:
+    started = time.perf_counter()
+    try:
+        run()
+    finally:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - started
+        if stats.statements is not None:
+            stats.statements.append(statement)
+    return True
+
+
+def _do_execute(cursor, statement, parameters, context):
+    stats = current.get()
+    if stats is None:
+        return None
+    dialect = context.dialect
+    _timed(stats, statement, lambda: type(dialect).do_execute(dialect, cursor, statement, parameters, context))
+    if cursor.description is not None:
+        context.cursor = _CountingCursor(cursor, stats)
+    return True
+
+
+def _do_execute_no_params(cursor, statement, context):
+    stats = current.get()
+    if stats is None:
+        return None
+    dialect = context.dialect
+    _timed(stats, statement, lambda: type(dialect).do_execute_no_params(dialect, cursor, statement, context))
+    if cursor.description is not None:
+        context.cursor = _CountingCursor(cursor, stats)
+    return True
+
+
+def _do_executemany(cursor, statement, parameters, context):
+    stats = current.get()
+    if stats is None:
+        return None
+    dialect = context.dialect
+    return _timed(stats, statement, lambda: type(dialect).do_executemany(dialect, cursor, statement, parameters, context))
+
+
+def instrument(engine) -> None:
+    # a sync Engine, or AsyncEngine.sync_engine
+    event.listen(engine, "do_execute", _do_execute)
+    event.listen(engine, "do_execute_no_params", _do_execute_no_params)
+    event.listen(engine, "do_executemany", _do_executemany)
+
+
+class MetricsMiddleware:
+    # plain ASGI so streamed bodies are timed to their last chunk
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        if settings.QUERY_BUDGET != "off":
+            stats.statements = []
+        token = current.set(stats)
+        started = time.perf_counter()
+        status = 500
+        done = None
+
+        async def send_wrapper(message):
+            nonlocal status, done
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # background tasks run after this; they are not part of the request
+                done = time.perf_counter(), stats.copy()
+                if stats.budget is not None:
+                    stats.budget.check(f"{scope['method']} {scope['route'].path}", stats)
+            elif message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.DEBUG:
+                    elapsed = time.perf_counter() - started
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.queries).encode()),
+                        (b"x-db-rows", str(stats.rows).encode()),
+                        (b"server-timing", f"db;dur={stats.sql_seconds * 1000:.2f}, app;dur={elapsed * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished, final = done or (time.perf_counter(), stats)
+            route = scope.get("route")
+            record(scope["method"], route.path if route is not None else "unmatched", status, finished - started, final)
+            current.reset(token)
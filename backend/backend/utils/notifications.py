@@ -0,0 +1,136 @@
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db.database import SessionLocal, upsert
+from backend.db import models
+from backend.utils import query_budget, stage_actions
+from backend.utils.emailer import send_email
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+digest = models.ReviewerDigest
+PENDING = next(ix for ix in digest.__table__.indexes if ix.name == "ix_reviewer_digest_pending").dialect_options["sqlite"]["where"]
+
+
+def mark_reviewers(db: Session, reviewer_ids) -> int:
+    # call in the transaction that hands the reviewers their work, so the digest commits
+    # (or rolls back) with it. At most one pending digest per reviewer, held by
+    # ix_reviewer_digest_pending; a new one is due one window after the last one sent.
+    reviewer_ids = sorted({r for r in reviewer_ids if r is not None})
+    if not reviewer_ids:
+        return 0
+    now = datetime.utcnow()
+    window = timedelta(seconds=settings.DIGEST_WINDOW_SECONDS)
+    last_sent = {}
+    for i in range(0, len(reviewer_ids), CHUNK_SIZE):
+        if i:
+            query_budget.allow()
+        chunk = reviewer_ids[i:i + CHUNK_SIZE]
+        last_sent.update(db.execute(
+            select(digest.reviewer_id, func.max(digest.sent_at))
+            .where(digest.reviewer_id.in_(chunk), digest.status == "sent")
+            .group_by(digest.reviewer_id)
+        ).all())
+    rows = [
+        {"reviewer_id": r, "status": "pending", "due_at": max(now, last_sent[r] + window) if r in last_sent else now, "created_at": now}
+        for r in reviewer_ids
+    ]
+    stmt = upsert(db, digest.__table__).on_conflict_do_nothing(index_elements=["reviewer_id"], index_where=PENDING)
+    return db.execute(stmt, rows).rowcount
+
+
+def drop_duplicate_pending(db) -> int:
+    # keeps each reviewer's oldest pending digest, so a table from before
+    # ix_reviewer_digest_pending can take the index
+    oldest = select(func.min(digest.id)).where(digest.status == "pending").group_by(digest.reviewer_id)
+    return db.execute(delete(digest).where(digest.status == "pending", digest.id.not_in(oldest))).rowcount
+
+
+def _pending_counts(db: Session, reviewer_id: int) -> list:
+    summary = models.CycleStageSummary
+    return db.execute(
+        select(models.ReviewCycle.id, models.ReviewCycle.quarter, summary.stage, summary.item_count)
+        .join(models.ReviewCycle, models.ReviewCycle.id == summary.cycle_id)
+        .where(summary.reviewer_id == reviewer_id, summary.stage != "completed", summary.item_count > 0)
+        .order_by(models.ReviewCycle.id)
+    ).all()
+
+
+def render_digest(user: models.User, counts: list) -> tuple:
+    total = sum(c.item_count for c in counts)
+    lines = [f"Hi {user.name},", "", f"You have {total} access review item(s) waiting for you:"]
+    cycles = {}
+    for c in counts:
+        cycles.setdefault((c.id, c.quarter), []).append(c)
+    for (cycle_id, quarter), rows in cycles.items():
+        rows.sort(key=lambda c: stage_actions.STAGES.index(c.stage))
+        stages = ", ".join(f"{stage_actions.STAGE_LABELS[c.stage]}: {c.item_count}" for c in rows)
+        lines += ["", f"{quarter} (cycle {cycle_id}) - {stages}", settings.INBOX_URL.format(user_id=user.id, cycle_id=cycle_id)]
+    return f"Access review: {total} item(s) awaiting your review", "\n".join(lines)
+
+
+def send_due(db: Session) -> int:
+    now = datetime.utcnow()
+    due = db.execute(select(digest.id, digest.reviewer_id).where(digest.status == "pending", digest.due_at <= now).order_by(digest.id)).all()
+    sent = 0
+    for digest_id, reviewer_id in due:
+        counts = _pending_counts(db, reviewer_id)
+        status = "sent" if counts else "skipped"
+        # the claim and the outbox row commit together, so concurrent senders never queue a digest twice
+        claimed = db.execute(
+            update(digest).where(digest.id == digest_id, digest.status == "pending").values(status=status, sent_at=now)
+        ).rowcount
+        if claimed and counts:
+            user = db.get(models.User, reviewer_id)
+            subject, body = render_digest(user, counts)
+            send_email(user.email, subject, body, db=db)
+            sent += 1
+        db.commit()
+    return sent
+
+
+def mark_cycle(db: Session, cycle_id: int) -> int:
+    # every reviewer with pending work in the cycle, once its items are in the session
+    summary = models.CycleStageSummary
+    return mark_reviewers(db, db.execute(
+        select(summary.reviewer_id).where(summary.cycle_id == cycle_id, summary.stage != "completed", summary.item_count > 0).distinct()
+    ).scalars().all())
+
+
+def send_pending() -> None:
+    # background task: sends the digests marked by a request once it has committed
+    db = SessionLocal()
+    try:
+        send_due(db)
+    except Exception:
+        logger.exception("digest notification failed")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send reviewer digest emails that are due")
+    parser.add_argument("--once", action="store_true", help="send due digests and exit")
+    parser.add_argument("--poll", type=float, default=60.0, help="seconds between polls")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        db = SessionLocal()
+        try:
+            send_due(db)
+        finally:
+            db.close()
+        if args.once:
+            break
+        time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    main()
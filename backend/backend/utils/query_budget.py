@@ -0,0 +1,138 @@
+import functools
+import inspect
+import logging
+import re
+from collections import Counter
+from typing import Optional
+from fastapi import Depends
+from backend.config import settings
+from backend.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# QUERY_BUDGET=raise fails the request or block (tests), log warns (dev), off skips
+# statement recording entirely (production)
+MODES = ("off", "log", "raise")
+if settings.QUERY_BUDGET not in MODES:
+    raise ValueError(f"QUERY_BUDGET must be one of {', '.join(MODES)}")
+
+REPORTED_FINGERPRINTS = 5
+
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|:\w+|\$\d+)"
+_LISTS = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(statement: str) -> str:
+    # literals and IN-list lengths don't distinguish one N+1 repetition from the next
+    statement = _LISTS.sub("(...)", statement)
+    statement = _LITERALS.sub("?", statement)
+    return " ".join(statement.split())
+
+
+def report(label: str, limit: int, statements: list) -> str:
+    repeated = Counter(fingerprint(s) for s in statements).most_common(REPORTED_FINGERPRINTS)
+    lines = [f"{label} ran {len(statements)} SQL statements, budget {limit}"]
+    lines += [f"  {n}x {fp}" for fp, n in repeated if n > 1]
+    return "\n".join(lines)
+
+
+def enforce(label: str, limit: int, statements: list) -> None:
+    if len(statements) <= limit:
+        return
+    message = report(label, limit, statements)
+    if settings.QUERY_BUDGET == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def allow(n: int = 1) -> None:
+    # budgets cover one batch of batched work; each further batch (another IN-list
+    # chunk, insert partition or apply chunk) allows its statements to every budget
+    # in force, so they scale with batches but not with rows
+    stats = metrics.current.get()
+    if stats is not None and stats.statements is not None:
+        stats.allowance += n
+
+
+class query_budget:
+    # at most `limit` SQL statements in a block (with query_budget(3, "apply"): ...)
+    # or per call of a decorated function
+
+    def __init__(self, limit: int, label: Optional[str] = None):
+        self.limit = limit
+        self.label = label
+        self._stats = None
+        self._start = self._allowance = 0
+        self._token = None
+
+    def __enter__(self):
+        if settings.QUERY_BUDGET == "off":
+            return self
+        stats = metrics.current.get()
+        if stats is None:
+            # outside a request (jobs, CLIs, tests calling helpers directly)
+            stats = metrics.RequestStats()
+            self._token = metrics.current.set(stats)
+        if stats.statements is None:
+            stats.statements = []
+        self._stats, self._start, self._allowance = stats, len(stats.statements), stats.allowance
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._stats is None:
+            return False
+        statements = self._stats.statements[self._start:]
+        limit = self.limit + self._stats.allowance - self._allowance
+        if self._token is not None:
+            metrics.current.reset(self._token)
+        self._stats = self._token = None
+        if exc_type is None:
+            enforce(self.label or "block", limit, statements)
+        return False
+
+    def __call__(self, fn):
+        limit, label = self.limit, self.label or fn.__qualname__
+        # a fresh budget per call, so concurrent calls don't share state
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with query_budget(limit, label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with query_budget(limit, label):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class _RouteBudget:
+    __slots__ = ("limit",)
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+
+    def check(self, label: str, stats) -> None:
+        if self.limit is not None:
+            enforce(label, self.limit + stats.allowance, stats.statements)
+
+
+def route_budget(limit: Optional[int]):
+    # statements for a whole request, checked by MetricsMiddleware once the body is
+    # sent, so lazy loads during serialization and streamed bodies count. Set on an
+    # APIRouter (dependencies=[route_budget(n)]) and overridden per route: the route's
+    # own dependency runs last and wins. None leaves the route to a block budget inside.
+    budget = _RouteBudget(limit)
+
+    async def set_route_budget():
+        stats = metrics.current.get()
+        if stats is not None and stats.statements is not None:
+            stats.budget = budget
+
+    return Depends(set_route_budget)
@@ -0,0 +1,139 @@
+import argparse
+from sqlalchemy import select, insert, delete, exists, func, literal, union_all
+from sqlalchemy.orm import Session, aliased
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import query_budget
+
+# reporting_closure holds one row per (manager, report) pair at any distance, so a
+# subtree, a skip-level manager or a roll-up is one indexed lookup however deep the org
+# is. Edges are each user's first reporting_map row, the manager the resolver uses.
+
+closure = models.ReportingClosure.__table__
+reporting = models.ReportingMap
+
+
+class ReportingCycleError(ValueError):
+    pass
+
+
+def _edges():
+    first_ids = select(func.min(reporting.id)).group_by(reporting.user_id)
+    return select(reporting.manager_id, reporting.user_id).where(reporting.id.in_(first_ids), reporting.manager_id != reporting.user_id)
+
+
+def first_managers(db) -> dict:
+    # user id -> manager_id of their first reporting_map row, self rows included, for
+    # checking many new rows in memory (bulk import)
+    first_ids = select(func.min(reporting.id)).group_by(reporting.user_id)
+    return dict(db.execute(select(reporting.user_id, reporting.manager_id).where(reporting.id.in_(first_ids))).all())
+
+
+def would_cycle(managers: dict, user_id: int, manager_id: int) -> bool:
+    # whether user_id is manager_id or above them; stops at a legacy cycle
+    seen = set()
+    while manager_id not in seen:
+        if manager_id == user_id:
+            return True
+        seen.add(manager_id)
+        manager_id = managers.get(manager_id, manager_id)
+    return False
+
+
+def rebuild(db) -> int:
+    # one insert per level of the org; a legacy cycle stops once its pairs all exist
+    db.execute(delete(closure))
+    edges = _edges().subquery()
+    rows = db.execute(
+        insert(closure).from_select(["ancestor_id", "descendant_id", "depth"], select(edges.c.manager_id, edges.c.user_id, literal(1)))
+    ).rowcount
+    total, depth = rows, 1
+    while rows:
+        query_budget.allow(1)
+        below = closure.alias("below")
+        known = closure.alias("known")
+        step = (
+            select(edges.c.manager_id, below.c.descendant_id, literal(depth + 1))
+            .join(edges, edges.c.user_id == below.c.ancestor_id)
+            .where(
+                below.c.depth == depth,
+                edges.c.manager_id != below.c.descendant_id,
+                ~exists().where(known.c.ancestor_id == edges.c.manager_id, known.c.descendant_id == below.c.descendant_id),
+            )
+        )
+        rows = db.execute(insert(closure).from_select(["ancestor_id", "descendant_id", "depth"], step)).rowcount
+        total += rows
+        depth += 1
+    return total
+
+
+def link(db: Session, user_id: int, manager_id: int) -> None:
+    # call before the reporting_map row is added. Only a user's first mapping makes an
+    # edge, so later rows for the same user leave the hierarchy as it is.
+    has_manager = select(reporting.id).where(reporting.user_id == user_id).limit(1).scalar_subquery()
+    above_manager = select(closure.c.depth).where(closure.c.ancestor_id == user_id, closure.c.descendant_id == manager_id).scalar_subquery()
+    existing, cycle = db.execute(select(has_manager, above_manager)).one()
+    if existing is not None:
+        return
+    if manager_id == user_id or cycle is not None:
+        raise ReportingCycleError("Mapping would make the user their own manager")
+    # the manager and everyone above them, times the user and everyone below them
+    above = union_all(
+        select(literal(manager_id).label("id"), literal(0).label("depth")),
+        select(closure.c.ancestor_id, closure.c.depth).where(closure.c.descendant_id == manager_id),
+    ).subquery()
+    below = union_all(
+        select(literal(user_id).label("id"), literal(0).label("depth")),
+        select(closure.c.descendant_id, closure.c.depth).where(closure.c.ancestor_id == user_id),
+    ).subquery()
+    db.execute(insert(closure).from_select(
+        ["ancestor_id", "descendant_id", "depth"],
+        select(above.c.id, below.c.id, above.c.depth + below.c.depth + 1).join(below, literal(True)),
+    ))
+
+
+def team(user_id: int):
+    # the user and everyone who reports to them, directly or not
+    return union_all(
+        select(literal(user_id)),
+        select(closure.c.descendant_id).where(closure.c.ancestor_id == user_id),
+    )
+
+
+def report_heads(manager_id: int):
+    # (head, member): the manager themself, then each direct report and their whole team
+    direct = aliased(models.ReportingClosure)
+    member = aliased(models.ReportingClosure)
+    return union_all(
+        select(literal(manager_id).label("head_id"), literal(manager_id).label("member_id")),
+        select(direct.descendant_id, direct.descendant_id).where(direct.ancestor_id == manager_id, direct.depth == 1),
+        select(direct.descendant_id, member.descendant_id)
+        .join(member, member.ancestor_id == direct.descendant_id)
+        .where(direct.ancestor_id == manager_id, direct.depth == 1),
+    ).subquery()
+
+
+def escalation_target(user_id: int, levels: int):
+    # the manager `levels` up from the user, or the top of their chain if it is shorter
+    return (
+        select(closure.c.ancestor_id, closure.c.depth)
+        .where(closure.c.descendant_id == user_id, closure.c.depth <= levels)
+        .order_by(closure.c.depth.desc())
+        .limit(1)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute reporting_closure from reporting_map")
+    parser.parse_args()
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"rebuilt reporting_closure: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import threading
+import time
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db import models
+
+MAP_MODELS = (models.ReportingMap, models.ReportingAppMap, models.AppManagerMap, models.AppOwnerMap, models.BusinessOwnerMap)
+
+
+class ReviewerMaps:
+    __slots__ = ("reporting", "reporting_apps", "app_managers", "app_owners", "business_owners")
+
+    def __init__(self, reporting, reporting_apps, app_managers, app_owners, business_owners):
+        self.reporting = reporting
+        self.reporting_apps = reporting_apps
+        self.app_managers = app_managers
+        self.app_owners = app_owners
+        self.business_owners = business_owners
+
+    def reviewers(self, user_id: int, app_id: int) -> tuple:
+        manager_id = self.reporting.get(user_id)
+        if manager_id is not None and (manager_id, app_id) not in self.reporting_apps:
+            manager_id = None
+        return manager_id, self.app_managers.get(app_id), self.app_owners.get(app_id), self.business_owners.get(app_id)
+
+    def add(self, row) -> None:
+        # the lowest-id row per key wins, and a new row always has the highest id
+        if isinstance(row, models.ReportingMap):
+            self.reporting.setdefault(row.user_id, row.manager_id)
+        elif isinstance(row, models.ReportingAppMap):
+            self.reporting_apps.add((row.manager_id, row.app_id))
+        elif isinstance(row, models.AppManagerMap):
+            self.app_managers.setdefault(row.app_id, row.user_id)
+        elif isinstance(row, models.AppOwnerMap):
+            self.app_owners.setdefault(row.app_id, row.user_id)
+        elif isinstance(row, models.BusinessOwnerMap):
+            self.business_owners.setdefault(row.app_id, row.user_id)
+
+    def sizes(self) -> dict:
+        return {name: len(getattr(self, name)) for name in self.__slots__}
+
+
+def _first_per_key(db: Session, model, key_col, value_col) -> dict:
+    first_ids = select(func.min(model.id)).group_by(key_col)
+    return dict(db.execute(select(key_col, value_col).where(model.id.in_(first_ids))).all())
+
+
+def load_maps(db: Session) -> ReviewerMaps:
+    return ReviewerMaps(
+        reporting=_first_per_key(db, models.ReportingMap, models.ReportingMap.user_id, models.ReportingMap.manager_id),
+        reporting_apps=set(db.execute(select(models.ReportingAppMap.manager_id, models.ReportingAppMap.app_id))),
+        app_managers=_first_per_key(db, models.AppManagerMap, models.AppManagerMap.app_id, models.AppManagerMap.user_id),
+        app_owners=_first_per_key(db, models.AppOwnerMap, models.AppOwnerMap.app_id, models.AppOwnerMap.user_id),
+        business_owners=_first_per_key(db, models.BusinessOwnerMap, models.BusinessOwnerMap.app_id, models.BusinessOwnerMap.user_id),
+    )
+
+
+def _stamp(db: Session) -> tuple:
+    # max ids of the mapping tables; the tables are insert-only, so any write moves the stamp
+    return tuple(db.execute(select(*[select(func.max(m.id)).scalar_subquery() for m in MAP_MODELS])).one())
+
+
+class ReviewerResolver:
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._maps = None
+        self._stamp = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.invalidations = 0
+
+    def maps(self, db: Session, verify: bool = False) -> ReviewerMaps:
+        # verify=True also catches writes made by other processes, at the cost of one query
+        with self._lock:
+            fresh = self._maps is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+            if fresh and verify:
+                fresh = _stamp(db) == self._stamp
+            if fresh:
+                self.hits += 1
+                return self._maps
+            self.misses += 1
+            self._stamp = _stamp(db)
+            self._maps = load_maps(db)
+            self._loaded_at = time.monotonic()
+            return self._maps
+
+    def reviewers(self, db: Session, user_id: int, app_id: int) -> tuple:
+        return self.maps(db).reviewers(user_id, app_id)
+
+    def add(self, row) -> None:
+        with self._lock:
+            if self._maps is None:
+                return
+            self._maps.add(row)
+            self.patches += 1
+            # keep the stamp current only when no other writer can have slipped in before this row
+            i = MAP_MODELS.index(type(row))
+            if row.id == (self._stamp[i] or 0) + 1:
+                self._stamp = self._stamp[:i] + (row.id,) + self._stamp[i + 1:]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._maps = None
+            self._stamp = None
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = self._maps is not None
+            return {
+                "loaded": loaded,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if loaded else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "patches": self.patches,
+                "invalidations": self.invalidations,
+                "sizes": self._maps.sizes() if loaded else {},
+            }
+
+
+resolver = ReviewerResolver(settings.RESOLVER_TTL_SECONDS)
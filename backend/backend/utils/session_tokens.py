@@ -0,0 +1,224 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import math
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select, insert, literal, union_all
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import metrics
+from backend.utils.stage_actions import STAGE_LABELS
+
+logger = logging.getLogger(__name__)
+
+# Compact HS256 JWTs. Claims: sub (user id), roles, scope ({stage: [app ids]}), iat, exp.
+# Everything a review route needs to authorize the caller is in the token, so checking
+# it costs an HMAC and no queries.
+
+if settings.AUTH_SECRET:
+    _SECRET = settings.AUTH_SECRET.encode()
+else:
+    _SECRET = secrets.token_bytes(32)
+    logger.warning("AUTH_SECRET is not set: session tokens are signed with a per-process key")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+# the only header accepted; anything else (alg=none, other algorithms) is rejected outright
+_HEADER = _b64encode(b'{"alg":"HS256","typ":"JWT"}')
+
+
+class TokenError(ValueError):
+    pass
+
+
+def _sign(signing_input: str) -> bytes:
+    return hmac.new(_SECRET, signing_input.encode(), hashlib.sha256).digest()
+
+
+def encode(claims: dict) -> str:
+    signing_input = f"{_HEADER}.{_b64encode(json.dumps(claims, separators=(',', ':')).encode())}"
+    return f"{signing_input}.{_b64encode(_sign(signing_input))}"
+
+
+def decode(token: str) -> dict:
+    parts = token.split(".")
+    if len(parts) != 3 or parts[0] != _HEADER:
+        raise TokenError("Malformed token")
+    try:
+        signature = _b64decode(parts[2])
+        valid = hmac.compare_digest(signature, _sign(f"{parts[0]}.{parts[1]}"))
+        claims = json.loads(_b64decode(parts[1])) if valid else None
+    except (binascii.Error, ValueError):
+        raise TokenError("Malformed token")
+    if not valid:
+        raise TokenError("Invalid token signature")
+    if claims.get("exp", 0) <= time.time():
+        raise TokenError("Token expired")
+    return claims
+
+
+# stage -> (reviewer column, app column) in the mapping table that makes a user a reviewer
+SCOPE_SOURCES = {
+    "reporting_manager": (models.ReportingAppMap.manager_id, models.ReportingAppMap.app_id),
+    "app_manager": (models.AppManagerMap.user_id, models.AppManagerMap.app_id),
+    "app_owner": (models.AppOwnerMap.user_id, models.AppOwnerMap.app_id),
+    "business_owner": (models.BusinessOwnerMap.user_id, models.BusinessOwnerMap.app_id),
+}
+
+
+def reviewer_scope(db: Session, user_id: int) -> dict:
+    # one query over the four mapping tables
+    stmt = union_all(*[
+        select(literal(stage).label("stage"), app_col.label("app_id")).where(user_col == user_id)
+        for stage, (user_col, app_col) in SCOPE_SOURCES.items()
+    ])
+    scope = {}
+    for stage, app_id in db.execute(stmt):
+        scope.setdefault(stage, set()).add(app_id)
+    return {stage: sorted(scope[stage]) for stage in SCOPE_SOURCES if stage in scope}
+
+
+def issue(user_id: int, roles: list, scope: dict) -> tuple:
+    now = time.time()
+    expires = int(now) + settings.AUTH_TOKEN_TTL_SECONDS
+    # millisecond iat, so a token issued just after a revocation is not caught by it;
+    # floored, as rounding up could date a token issued just before one after it
+    token = encode({"sub": str(user_id), "roles": roles, "scope": scope, "iat": math.floor(now * 1000) / 1000, "exp": expires})
+    return token, datetime.utcfromtimestamp(expires)
+
+
+class Principal:
+    __slots__ = ("user_id", "roles", "scope", "issued_at")
+
+    def __init__(self, claims: dict):
+        self.user_id = int(claims["sub"])
+        self.roles = frozenset(claims.get("roles", ()))
+        self.scope = {stage: frozenset(app_ids) for stage, app_ids in claims.get("scope", {}).items()}
+        self.issued_at = claims["iat"]
+
+    def reviews(self, stage: str, app_id: Optional[int] = None) -> bool:
+        apps = self.scope.get(stage)
+        return apps is not None and (app_id is None or app_id in apps)
+
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    # user id -> latest revocation time. Revocations made here apply at once; those made by
+    # other processes are read from token_revocation every refresh_seconds. Only the last
+    # token lifetime's worth matters: older revocations can only reject expired tokens.
+
+    def __init__(self, refresh_seconds: int, token_ttl_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self.token_ttl_seconds = token_ttl_seconds
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._refreshed_at = None
+
+    def revoke(self, db: Session, user_ids, reason: str) -> None:
+        # in the caller's transaction, next to the role or mapping change it is for
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        now = datetime.utcnow()
+        db.execute(insert(models.TokenRevocation), [{"user_id": u, "reason": reason, "revoked_at": now} for u in user_ids])
+        with self._lock:
+            for u in user_ids:
+                self._revoked[u] = max(self._revoked.get(u, 0.0), _epoch(now))
+
+    def due(self) -> bool:
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds
+
+    def refresh(self) -> None:
+        # process housekeeping, not part of whichever request happened to trigger it
+        token = metrics.current.set(None)
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.token_ttl_seconds)
+            rev = models.TokenRevocation
+            with SessionLocal() as db:
+                rows = db.execute(select(rev.user_id, rev.revoked_at).where(rev.revoked_at > cutoff)).all()
+        finally:
+            metrics.current.reset(token)
+        horizon = _epoch(cutoff)
+        with self._lock:
+            revoked = {u: t for u, t in self._revoked.items() if t > horizon}
+            for user_id, revoked_at in rows:
+                revoked[user_id] = max(revoked.get(user_id, 0.0), _epoch(revoked_at))
+            self._revoked = revoked
+            self._refreshed_at = time.monotonic()
+
+    def is_revoked(self, user_id: int, issued_at: float) -> bool:
+        revoked_at = self._revoked.get(user_id)
+        return revoked_at is not None and issued_at <= revoked_at
+
+
+revocations = RevocationList(settings.AUTH_REVOCATION_REFRESH_SECONDS, settings.AUTH_TOKEN_TTL_SECONDS)
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(401, detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def current_principal(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[Principal]:
+    # None when no token was sent and AUTH_REQUIRED is off (callers then trust the body
+    # as before); a token that is sent is always checked
+    if credentials is None:
+        if settings.AUTH_REQUIRED:
+            raise _unauthorized("Not authenticated")
+        return None
+    try:
+        principal = Principal(decode(credentials.credentials))
+    except (TokenError, KeyError, TypeError) as exc:
+        raise _unauthorized(str(exc) if isinstance(exc, TokenError) else "Malformed token")
+    if revocations.due():
+        await run_in_threadpool(revocations.refresh)
+    if revocations.is_revoked(principal.user_id, principal.issued_at):
+        raise _unauthorized("Token revoked, log in again")
+    return principal
+
+
+def authorize_actor(principal: Optional[Principal], actor_user_id: int, stage: Optional[str] = None) -> None:
+    # writes are recorded under actor_user_id, so it has to be the caller, admins included
+    if principal is None:
+        return
+    if principal.user_id != actor_user_id:
+        raise HTTPException(403, "actor_user_id does not match the session")
+    if stage is not None and not principal.reviews(stage):
+        raise HTTPException(403, f"Not a {STAGE_LABELS[stage]} reviewer")
+
+
+def authorize_reader(principal: Optional[Principal], *user_ids: int) -> None:
+    # a reviewer reads their own queue (or items they review); admins and auditors read anyone's
+    if principal is None or principal.user_id in user_ids or principal.roles & {"admin", "auditor"}:
+        return
+    raise HTTPException(403, "Cannot read another reviewer's items")
+
+
+def authorize_admin(principal: Optional[Principal]) -> None:
+    # cycle-wide writes (starting a cycle, applying its staging) are for admins
+    if principal is None or "admin" in principal.roles:
+        return
+    raise HTTPException(403, "Admin role required")
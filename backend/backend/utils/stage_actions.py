@@ -0,0 +1,379 @@
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, insert, update, case, exists, func, literal, literal_column, or_, text
+from sqlalchemy.orm import Session
+from backend.db import models
+from backend.utils import cycle_summary, notifications, query_budget
+
+# The review pipeline in its default order: stage, code in stage chains, label and
+# reviewer column on ReviewItem. Applications may review in a different order
+# (Application.stage_order).
+PIPELINE = (
+    ("reporting_manager", 1, "Reporting Manager", models.ReviewItem.reporting_manager_id),
+    ("app_manager", 2, "Application Manager", models.ReviewItem.app_manager_id),
+    ("app_owner", 3, "Application Owner", models.ReviewItem.app_owner_id),
+    ("business_owner", 4, "Business Owner", models.ReviewItem.business_owner_id),
+)
+
+STAGES = [stage for stage, *_ in PIPELINE]
+STAGE_CODES = {stage: code for stage, code, *_ in PIPELINE}
+STAGE_LABELS = {stage: label for stage, _, label, _ in PIPELINE}
+REVIEWER_COLUMNS = {stage: column for stage, _, _, column in PIPELINE}
+
+# <prefix>_action / _comment / _timestamp columns that held decisions on review_item
+# before stage_decision; only read by migrate_decisions()
+LEGACY_DECISION_PREFIXES = {
+    "reporting_manager": "manager",
+    "app_manager": "application_manager",
+    "app_owner": "application_owner",
+    "business_owner": "business_owner",
+}
+
+# ReviewItem.stage_chain holds the stages still to come after pending_stage, CHAIN_BITS
+# per stage code with the next one in the low bits, so advancing an item is a mask and
+# a shift in SQL whatever its order
+CHAIN_BITS = 3
+CHAIN_MASK = (1 << CHAIN_BITS) - 1
+
+_REVIEWER_INDEX = {stage: i for i, stage in enumerate(STAGES)}
+
+APPROVE_ACTIONS = ("approve", "final_approve", "apply", "retain")
+
+ERROR_STATUS_CODES = {"not_found": 404, "wrong_stage": 400, "forbidden": 403, "conflict": 409, "access_missing": 500}
+
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        if i:
+            query_budget.allow()
+        yield values[i:i + size]
+
+
+def parse_stage_order(value) -> Optional[tuple]:
+    # an application's stage order: stage names, comma-separated or as a list; stages it
+    # leaves out are skipped for its items
+    if value is None:
+        return None
+    stages = [s.strip() for s in value.split(",")] if isinstance(value, str) else list(value)
+    unknown = [s for s in stages if s not in STAGE_CODES]
+    if unknown:
+        raise ValueError(f"unknown stage {unknown[0]!r}, expected some of {', '.join(STAGES)}")
+    if not stages or len(set(stages)) != len(stages):
+        raise ValueError("stage order must list each stage at most once")
+    # a business owner decision applies or rejects the staged change, so nothing may follow it
+    if "business_owner" in stages and stages[-1] != "business_owner":
+        raise ValueError("business_owner must be the last stage")
+    return tuple(stages)
+
+
+def stage_orders(db: Session) -> dict:
+    # app id -> stage order, for the applications that don't use the default
+    rows = db.execute(select(models.Application.id, models.Application.stage_order).where(models.Application.stage_order.isnot(None)))
+    return {app_id: parse_stage_order(order) for app_id, order in rows}
+
+
+def routed(reviewers: tuple, order: Optional[tuple] = None) -> tuple:
+    # the reviewers an item is stored with: stages the order leaves out have none, so a
+    # business owner outside the order doesn't hold back cycle apply
+    if order is None:
+        return reviewers
+    return tuple(r if s in order else None for s, r in zip(STAGES, reviewers))
+
+
+def plan(reviewers: tuple, order: Optional[tuple] = None) -> tuple:
+    # (first stage, stage chain) for an item; reviewers in STAGES order, as returned by the
+    # reviewer resolver; stages without a reviewer are skipped
+    stages = [s for s in (order or STAGES) if reviewers[_REVIEWER_INDEX[s]]]
+    if not stages:
+        return "completed", 0
+    chain = 0
+    for stage in reversed(stages[1:]):
+        chain = chain << CHAIN_BITS | STAGE_CODES[stage]
+    return stages[0], chain
+
+
+def first_stage(reviewers: tuple, order: Optional[tuple] = None) -> str:
+    return plan(reviewers, order)[0]
+
+
+def advance_values(action: str) -> dict:
+    # moves an item to the next stage in its chain, or completes it with `action`
+    item = models.ReviewItem
+    code = item.stage_chain.op("&")(CHAIN_MASK)
+    return {
+        "pending_stage": case(*[(code == c, s) for s, c in STAGE_CODES.items()], else_="completed"),
+        "stage_chain": item.stage_chain.op(">>")(CHAIN_BITS),
+        "final_status": case((code == 0, action), else_=item.final_status),
+    }
+
+
+def default_chain(stage: str):
+    # the chain of an item at `stage` that follows the default order, from its reviewer columns
+    chain = literal(0)
+    for later in reversed(STAGES[STAGES.index(stage) + 1:]):
+        chain = case((REVIEWER_COLUMNS[later].isnot(None), chain.op("<<")(CHAIN_BITS).op("|")(STAGE_CODES[later])), else_=chain)
+    return chain
+
+
+def backfill_chains(conn) -> None:
+    # items written before stage chains existed were routed in the default order
+    for stage in STAGES[:-1]:
+        conn.execute(update(models.ReviewItem).where(models.ReviewItem.pending_stage == stage).values(stage_chain=default_chain(stage)))
+
+
+def migrate_decisions(conn, columns: set) -> None:
+    # copies decisions out of the legacy review_item columns still in `columns`, then
+    # drops them so the rows shrink
+    for stage, prefix in LEGACY_DECISION_PREFIXES.items():
+        names = [f"{prefix}_{field}" for field in ("action", "comment", "timestamp")]
+        if names[0] in columns:
+            action, comment, timestamp = [literal_column(name) for name in names]
+            conn.execute(insert(models.StageDecision).from_select(
+                ["review_item_id", "stage", "action", "comment", "decided_at"],
+                select(models.ReviewItem.id, literal(stage), action, comment, func.coalesce(timestamp, func.current_timestamp()))
+                .select_from(models.ReviewItem).where(action.isnot(None)),
+            ))
+        for name in names:
+            if name in columns:
+                conn.execute(text(f"ALTER TABLE review_item DROP COLUMN {name}"))
+
+
+def decision_rows(item_ids, stage: str, action: str, comment: Optional[str], now: datetime) -> list:
+    return [{"review_item_id": i, "stage": stage, "action": action, "comment": comment, "decided_at": now} for i in item_ids]
+
+
+def _result(item_id, status, pending_stage=None, detail=None):
+    return {"review_item_id": item_id, "status": status, "pending_stage": pending_stage, "detail": detail}
+
+
+def _approvable(stage: str, action: str):
+    # a business owner approval applies the item's staged change, which needs the access row
+    if stage != "business_owner" or action.lower() not in APPROVE_ACTIONS:
+        return None
+    item = models.ReviewItem
+    staged = exists().where(models.StagingChange.review_item_id == item.id, models.StagingChange.applied == False)
+    return or_(~staged, exists().where(models.Access.id == item.access_id))
+
+
+def _transition(db: Session, stage: str, actor_user_id: int, action: str,
+                item_ids: Optional[list], cycle_id: Optional[int], expected_version: Optional[int]) -> list:
+    # compare-and-set: the stage and reviewer checks are the WHERE clause of the UPDATE that
+    # moves the item on, so a concurrent or repeated action matches no row instead of
+    # applying twice, and no SELECT precedes the write lock
+    item = models.ReviewItem
+    values = {**advance_values(action), "version": item.version + 1}
+    conditions = [item.pending_stage == stage, REVIEWER_COLUMNS[stage] == actor_user_id]
+    if expected_version is not None:
+        conditions.append(item.version == expected_version)
+    approvable = _approvable(stage, action)
+    if approvable is not None:
+        conditions.append(approvable)
+    stmt = (
+        update(item).where(*conditions).values(values)
+        .returning(item.id, item.cycle_id, item.access_id, item.pending_stage, *REVIEWER_COLUMNS.values())
+        .execution_options(synchronize_session=False)
+    )
+    if item_ids is None:
+        return sorted(db.execute(stmt.where(item.cycle_id == cycle_id)).all(), key=lambda r: r.id)
+    rows = []
+    for chunk in _chunks(item_ids):
+        rows.extend(db.execute(stmt.where(item.id.in_(chunk))).all())
+    return rows
+
+
+def _diagnose(db: Session, stage: str, actor_user_id: int, action: str, item_ids: list, expected_version: Optional[int]) -> dict:
+    # why the transition skipped these items; runs only when something failed
+    item = models.ReviewItem
+    found = {}
+    for chunk in _chunks(item_ids):
+        stmt = select(item.id, item.access_id, item.pending_stage, item.version, REVIEWER_COLUMNS[stage].label("reviewer_id"))
+        for r in db.execute(stmt.where(item.id.in_(chunk))):
+            found[r.id] = r
+    missing = set()
+    if _approvable(stage, action) is not None:
+        at_stage = [i for i, r in found.items() if r.pending_stage == stage]
+        missing = missing_access(db, load_staging(db, at_stage), {i: found[i].access_id for i in at_stage})
+
+    results = {}
+    for item_id in item_ids:
+        r = found.get(item_id)
+        if r is None:
+            results[item_id] = _result(item_id, "not_found", detail="Review item not found")
+        elif expected_version is not None and r.version != expected_version:
+            results[item_id] = _result(item_id, "conflict", r.pending_stage, f"Item has changed (version {r.version}), reload it")
+        elif r.pending_stage != stage:
+            results[item_id] = _result(item_id, "wrong_stage", r.pending_stage, f"Item is not at {STAGE_LABELS[stage]} stage")
+        elif r.reviewer_id != actor_user_id:
+            results[item_id] = _result(item_id, "forbidden", r.pending_stage, "Not authorized for this item")
+        elif item_id in missing:
+            results[item_id] = _result(item_id, "access_missing", stage, "Access record missing")
+        else:
+            results[item_id] = _result(item_id, "conflict", r.pending_stage, "Item was changed concurrently, retry")
+    return results
+
+
+def _upsert_staging(db: Session, stage: str, item_ids: list, actor_user_id: int, action: str, comment: Optional[str], now: datetime):
+    values = {"proposed_action": action, "proposed_by_id": actor_user_id, "last_stage": stage, "proposed_at": now}
+    if comment:
+        values["payload"] = comment
+    staged = set()
+    for chunk in _chunks(item_ids):
+        staged.update(db.execute(
+            select(models.StagingChange.review_item_id).where(models.StagingChange.review_item_id.in_(chunk), models.StagingChange.applied == False)
+        ).scalars())
+        db.execute(
+            update(models.StagingChange)
+            .where(models.StagingChange.review_item_id.in_(chunk), models.StagingChange.applied == False)
+            .values(**values)
+        )
+    new_rows = [
+        {"review_item_id": i, "proposed_action": action, "proposed_by_id": actor_user_id, "payload": comment or None,
+         "last_stage": stage, "proposed_at": now, "applied": False}
+        for i in item_ids if i not in staged
+    ]
+    if new_rows:
+        db.execute(insert(models.StagingChange), new_rows)
+
+
+def load_staging(db: Session, item_ids: list) -> dict:
+    # first unapplied staging row per review item
+    staging = {}
+    for chunk in _chunks(item_ids):
+        for s in db.execute(
+            select(models.StagingChange.id, models.StagingChange.review_item_id, models.StagingChange.proposed_action, models.StagingChange.payload)
+            .where(models.StagingChange.review_item_id.in_(chunk), models.StagingChange.applied == False)
+            .order_by(models.StagingChange.id)
+        ):
+            staging.setdefault(s.review_item_id, s)
+    return staging
+
+
+def missing_access(db: Session, staging: dict, access_of: dict) -> set:
+    existing_access = set()
+    for chunk in _chunks({access_of[i] for i in staging}):
+        existing_access.update(db.execute(select(models.Access.id).where(models.Access.id.in_(chunk))).scalars())
+    return {i for i in staging if access_of[i] not in existing_access}
+
+
+def plan_staging(s) -> tuple:
+    # (audit action, audit details, revoke?, new owner user_id) for one staged change
+    proposed = s.proposed_action.lower()
+    if proposed == "revoke":
+        return "applied_revoke", s.payload, True, None
+    if proposed == "retain":
+        return "applied_retain", s.payload, False, None
+    if proposed == "modify":
+        try:
+            payload_obj = json.loads(s.payload) if s.payload else {}
+        except ValueError:
+            payload_obj = {}
+        if not isinstance(payload_obj, dict):
+            payload_obj = {}
+        if payload_obj.get("new_user_id"):
+            return "applied_modify_transfer", str(payload_obj), False, int(payload_obj["new_user_id"])
+        return "applied_modify_noop", s.payload, False, None
+    return f"applied_unknown_{s.proposed_action}", s.payload, False, None
+
+
+def write_applied(db: Session, revoke_ids: list, transfers: list, applied_staging: list, audits: list, now: datetime):
+    for chunk in _chunks(revoke_ids):
+        db.execute(update(models.Access).where(models.Access.id.in_(chunk)).values(active=False))
+    if transfers:
+        db.execute(update(models.Access), transfers)
+    for chunk in _chunks(applied_staging):
+        db.execute(update(models.StagingChange).where(models.StagingChange.id.in_(chunk)).values(applied=True, applied_at=now))
+    if audits:
+        db.execute(insert(models.AuditLog), audits)
+
+
+def _apply_business_owner(db: Session, rows: list, actor_user_id: int, action: str, comment: Optional[str], now: datetime):
+    if not rows:
+        return
+    item_ids = [r.id for r in rows]
+    access_of = {r.id: r.access_id for r in rows}
+    cycle_of = {r.id: r.cycle_id for r in rows}
+    audits = []
+
+    if action.lower() not in APPROVE_ACTIONS:
+        audits = [{"review_item_id": i, "cycle_id": cycle_of[i], "action": "bo_rejected", "applied_by": actor_user_id, "details": comment, "applied_at": now} for i in item_ids]
+        db.execute(insert(models.AuditLog), audits)
+        return
+
+    # access rows of staged items were checked by the transition (_approvable)
+    staging = load_staging(db, item_ids)
+    revoke_ids, transfers, applied_staging = [], [], []
+    for item_id in item_ids:
+        s = staging.get(item_id)
+        if s is None:
+            audits.append({"review_item_id": item_id, "cycle_id": cycle_of[item_id], "action": "applied_direct_retain", "applied_by": actor_user_id, "details": comment, "applied_at": now})
+            continue
+        audit_action, details, revoke, new_user_id = plan_staging(s)
+        if revoke:
+            revoke_ids.append(access_of[item_id])
+        if new_user_id:
+            transfers.append({"id": access_of[item_id], "user_id": new_user_id})
+        audits.append({"review_item_id": item_id, "cycle_id": cycle_of[item_id], "action": audit_action, "applied_by": actor_user_id, "details": details, "applied_at": now})
+        applied_staging.append(s.id)
+
+    write_applied(db, revoke_ids, transfers, applied_staging, audits, now)
+
+
+def apply_stage_action(
+    db: Session,
+    stage: str,
+    actor_user_id: int,
+    action: str,
+    comment: Optional[str] = None,
+    item_ids: Optional[list] = None,
+    cycle_id: Optional[int] = None,
+    expected_version: Optional[int] = None,
+) -> list:
+    now = datetime.utcnow()
+    rows = _transition(db, stage, actor_user_id, action, item_ids, cycle_id, expected_version)
+    reviewer_of = {s: col.key for s, col in REVIEWER_COLUMNS.items()}
+
+    results = {r.id: _result(r.id, "ok", r.pending_stage) for r in rows}
+    if item_ids is not None:
+        failed = [i for i in dict.fromkeys(item_ids) if i not in results]
+    elif _approvable(stage, action) is not None:
+        # items held back by the access check are still pending for this reviewer
+        item = models.ReviewItem
+        failed = db.execute(
+            select(item.id).where(item.cycle_id == cycle_id, item.pending_stage == stage, REVIEWER_COLUMNS[stage] == actor_user_id)
+        ).scalars().all()
+    else:
+        failed = []
+    if failed:
+        results.update(_diagnose(db, stage, actor_user_id, action, failed, expected_version))
+    order = dict.fromkeys(item_ids) if item_ids is not None else sorted(results)
+
+    if stage == "business_owner":
+        _apply_business_owner(db, rows, actor_user_id, action, comment, now)
+    elif rows:
+        _upsert_staging(db, stage, [r.id for r in rows], actor_user_id, action, comment, now)
+
+    deltas = Counter()
+    history = []
+    handed_to = set()
+    for r in rows:
+        target = r.pending_stage
+        history.append({"review_item_id": r.id, "cycle_id": r.cycle_id, "actor_id": actor_user_id, "stage": stage, "action": action, "comment": comment, "timestamp": now})
+        deltas[(r.cycle_id, stage, actor_user_id, None)] -= 1
+        if target == "completed":
+            deltas[(r.cycle_id, target, None, action)] += 1
+        else:
+            reviewer_id = getattr(r, reviewer_of[target])
+            handed_to.add(reviewer_id)
+            deltas[(r.cycle_id, target, reviewer_id, None)] += 1
+
+    if history:
+        db.execute(insert(models.StageDecision), decision_rows([r.id for r in rows], stage, action, comment, now))
+        db.execute(insert(models.ApprovalHistory), history)
+    cycle_summary.apply_deltas(db, deltas)
+    notifications.mark_reviewers(db, handed_to)
+    return [results[i] for i in order]
@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, func, exists, and_, or_
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import query_budget, stage_actions
+
+# one chunk: items, staging, access check, revokes, transfers, staging update, audits
+STATEMENTS_PER_CHUNK = 7
+
+
+def _approved_unapplied(cycle_id: int):
+    item = models.ReviewItem
+    staged = exists().where(models.StagingChange.review_item_id == item.id, models.StagingChange.applied == False)
+    # without a business owner stage the last reviewer's decision is final, unless it was a rejection
+    approved = or_(
+        func.lower(item.final_status).in_(stage_actions.APPROVE_ACTIONS),
+        and_(item.business_owner_id.is_(None), func.lower(item.final_status) != "reject"),
+    )
+    return (
+        select(item.id, item.access_id)
+        .where(item.cycle_id == cycle_id, item.pending_stage == "completed", approved, staged)
+        .order_by(item.id)
+    )
+
+
+def apply_cycle(db: Session, cycle_id: int, actor_user_id: int, dry_run: bool = False, chunk_size: Optional[int] = None) -> dict:
+    chunk_size = chunk_size or settings.APPLY_CHUNK_SIZE
+    stmt = _approved_unapplied(cycle_id)
+    by_action = Counter()
+    items = applied = missing_total = 0
+    last_id = 0
+    while True:
+        if last_id:
+            query_budget.allow(STATEMENTS_PER_CHUNK)
+        rows = db.execute(stmt.where(models.ReviewItem.id > last_id).limit(chunk_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        items += len(rows)
+        access_of = {r.id: r.access_id for r in rows}
+        staging = stage_actions.load_staging(db, list(access_of))
+        missing = stage_actions.missing_access(db, staging, access_of)
+        missing_total += len(missing)
+
+        now = datetime.utcnow()
+        revoke_ids, transfers, applied_staging, audits = [], [], [], []
+        for item_id, s in staging.items():
+            if item_id in missing:
+                continue
+            audit_action, details, revoke, new_user_id = stage_actions.plan_staging(s)
+            by_action[audit_action] += 1
+            if revoke:
+                revoke_ids.append(access_of[item_id])
+            if new_user_id:
+                transfers.append({"id": access_of[item_id], "user_id": new_user_id})
+            audits.append({"review_item_id": item_id, "cycle_id": cycle_id, "action": audit_action, "applied_by": actor_user_id, "details": details, "applied_at": now})
+            applied_staging.append(s.id)
+        applied += len(applied_staging)
+
+        # one transaction per chunk; applied rows drop out of the next chunk's query
+        if not dry_run:
+            stage_actions.write_applied(db, revoke_ids, transfers, applied_staging, audits, now)
+            db.commit()
+
+    return {
+        "cycle_id": cycle_id,
+        "dry_run": dry_run,
+        "items": items,
+        "applied": applied,
+        "access_missing": missing_total,
+        "by_action": dict(by_action),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply approved staging changes for a review cycle")
+    parser.add_argument("cycle_id", type=int)
+    parser.add_argument("--actor-user-id", type=int, required=True, help="recorded as applied_by in the audit log")
+    parser.add_argument("--dry-run", action="store_true", help="count only")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        report = apply_cycle(db, args.cycle_id, args.actor_user_id, args.dry_run)
+    finally:
+        db.close()
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from backend.config import settings
+from backend.db import database
+from backend.db.database import SessionLocal
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class ListParams:
+    def __init__(
+        self,
+        format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+        limit: Optional[int] = Query(None, ge=1),
+        offset: int = Query(0, ge=0),
+    ):
+        self.format = format
+        self.limit = limit
+        self.offset = offset
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode_ndjson(fields, rows) -> str:
+    return "".join(json.dumps(dict(zip(fields, row)), default=_json_default) + "\n" for row in rows)
+
+
+def _encode_csv(fields, rows) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+
+def _stream(stmt, fields, format: str):
+    # own session: the request-scoped one may be closed before the body is sent
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=settings.STREAM_BATCH_SIZE))
+        if format == "csv":
+            yield _encode_csv(fields, [fields])
+        encode = _encode_csv if format == "csv" else _encode_ndjson
+        for batch in result.partitions():
+            yield encode(fields, batch)
+    finally:
+        db.close()
+
+
+async def _astream(stmt, fields, format: str):
+    async with database.AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.STREAM_BATCH_SIZE))
+        if format == "csv":
+            yield _encode_csv(fields, [fields])
+        encode = _encode_csv if format == "csv" else _encode_ndjson
+        async for batch in result.partitions():
+            yield encode(fields, batch)
+
+
+def _stream_columns(stmt, schema):
+    table = stmt.column_descriptions[0]["entity"].__table__
+    fields = list(schema.model_fields)
+    return stmt.with_only_columns(*[table.c[f] for f in fields], maintain_column_froms=True), fields
+
+
+def list_response(db: Session, stmt, schema, params: ListParams):
+    stmt = stmt.offset(params.offset).limit(params.limit)
+    if params.format is None:
+        return db.scalars(stmt).all()
+
+    stmt, fields = _stream_columns(stmt, schema)
+    return StreamingResponse(_stream(stmt, fields, params.format), media_type=MEDIA_TYPES[params.format])
+
+
+async def list_response_async(db, stmt, schema, params: ListParams):
+    # db comes from get_read_db, so it is an AsyncSession or a sync Session depending on DB_MODE
+    stmt = stmt.offset(params.offset).limit(params.limit)
+    if params.format is None:
+        return (await database.execute(db, stmt)).scalars().all()
+
+    stmt, fields = _stream_columns(stmt, schema)
+    body = _stream(stmt, fields, params.format) if database.AsyncSessionLocal is None else _astream(stmt, fields, params.format)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[params.format])
@@ -0,0 +1,9 @@
+from benchmarks.generator import generate, sizes
+
+
+def test_numeric_scale(tmp_path):
+    # --bench-scale / --scale pass a plain row count through as a string
+    assert sizes("2000") == sizes(2000) == {"access": 2000, "users": 250, "applications": 20}
+    counts = generate(f"sqlite:///{tmp_path / 'org.db'}", "2000")
+    assert counts["access"] == 2000
+    assert counts["users"] == 250
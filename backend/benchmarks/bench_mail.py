@@ -0,0 +1,149 @@
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import delete, insert, select, update
+from backend.config import settings
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import mail_worker
+
+aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+outbox = models.NotificationOutbox.__table__
+
+MESSAGES = 2000
+
+
+class Sink:
+    # SMTP stand-in: accepts every message, or answers DATA with `reply` (e.g. "451 ...")
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.received = 0
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reply:
+            return self.reply
+        with self._lock:
+            self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(client, monkeypatch):
+    # starts a stand-in with the given handler and points the worker at it; client
+    # brings the working database up to the current schema
+    controllers = []
+
+    def start(handler):
+        controller = aiosmtpd.Controller(handler, hostname="127.0.0.1", port=_free_port())
+        controller.start()
+        controllers.append(controller)
+        monkeypatch.setattr(settings, "SMTP_HOST", controller.hostname)
+        monkeypatch.setattr(settings, "SMTP_PORT", controller.port)
+        return handler
+
+    yield start
+    for controller in controllers:
+        controller.stop()
+
+
+def _enqueue(n: int) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(outbox))
+        now = datetime.utcnow()
+        db.execute(insert(outbox), [
+            {"to_email": f"user{i}@example.com", "subject": "Pending access reviews", "body": "You have items to review.",
+             "status": "pending", "attempts": 0, "next_attempt_at": now}
+            for i in range(n)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _rows() -> list:
+    db = SessionLocal()
+    try:
+        return db.execute(select(outbox).order_by(outbox.c.id)).all()
+    finally:
+        db.close()
+
+
+def _deliver_once() -> dict:
+    pool = mail_worker.SMTPPool(1)
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return mail_worker.deliver_batch(db, pool, executor)
+    finally:
+        db.close()
+        pool.close()
+
+
+def _make_due() -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(outbox).values(next_attempt_at=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_drain_throughput(benchmark, smtp):
+    sink = smtp(Sink())
+    totals, seconds = [], []
+
+    def run():
+        started = time.perf_counter()
+        totals.append(mail_worker.drain())
+        seconds.append(time.perf_counter() - started)
+
+    benchmark.pedantic(run, setup=lambda: _enqueue(MESSAGES), rounds=3, iterations=1)
+    assert all(t["sent"] == MESSAGES for t in totals)
+    assert sink.received == MESSAGES * len(totals)
+    benchmark.extra_info["messages"] = MESSAGES
+    benchmark.extra_info["messages_per_second"] = round(MESSAGES * len(seconds) / sum(seconds))
+
+
+def test_transient_refusal_backs_off_then_dead_letters(smtp, monkeypatch):
+    smtp(Sink("451 4.3.0 Try again later"))
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    _enqueue(1)
+    base = settings.OUTBOX_BACKOFF_SECONDS
+    for attempts in (1, 2):
+        started = datetime.utcnow()
+        assert _deliver_once() == {"claimed": 1, "sent": 0, "retry": 1, "dead": 0}
+        row = _rows()[0]
+        assert (row.status, row.attempts, row.claim_token) == ("pending", attempts, None)
+        assert "451" in row.last_error
+        # exponential backoff with +-20% jitter
+        delay = base * 2 ** (attempts - 1)
+        assert started + timedelta(seconds=delay * 0.8) <= row.next_attempt_at <= datetime.utcnow() + timedelta(seconds=delay * 1.2)
+        # not due again until the backoff has passed
+        assert _deliver_once()["claimed"] == 0
+        _make_due()
+
+    assert _deliver_once() == {"claimed": 1, "sent": 0, "retry": 0, "dead": 1}
+    row = _rows()[0]
+    assert (row.status, row.attempts) == ("dead", 3)
+    _make_due()
+    assert _deliver_once()["claimed"] == 0
+
+
+def test_permanent_refusal_dead_letters_at_once(smtp):
+    smtp(Sink("550 5.1.1 Mailbox unavailable"))
+    _enqueue(3)
+    assert _deliver_once() == {"claimed": 3, "sent": 0, "retry": 0, "dead": 3}
+    assert {(r.status, r.attempts) for r in _rows()} == {("dead", 1)}
+    assert all("550" in r.last_error for r in _rows())
@@ -0,0 +1,195 @@
+import itertools
+import pytest
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import OperationalError
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import stage_actions
+
+STAGE_PATHS = {
+    "reporting_manager": "reporting-manager",
+    "app_manager": "app-manager",
+    "app_owner": "app-owner",
+    "business_owner": "business-owner",
+}
+
+SINGLE_ROUNDS = 100
+BULK_ROUNDS = 5
+BULK_SIZE = 200
+
+LIST_ENDPOINTS = [
+    "/users/?limit=100",
+    "/roles/",
+    "/applications/",
+    "/access/?limit=1000",
+    "/access/?format=ndjson&limit=10000",
+    "/mappings/reporting?limit=1000",
+    "/review/cycles",
+]
+
+
+def _ok(response):
+    assert response.status_code == 200, response.text
+    return response
+
+
+def _pending(cycle_id: int, stage: str) -> list:
+    # (item id, reviewer id) at the stage, busiest reviewers first
+    col = stage_actions.REVIEWER_COLUMNS[stage]
+    db = SessionLocal()
+    try:
+        load = func.count().over(partition_by=col)
+        rows = db.execute(
+            select(models.ReviewItem.id, col)
+            .where(models.ReviewItem.cycle_id == cycle_id, models.ReviewItem.pending_stage == stage)
+            .order_by(load.desc(), col, models.ReviewItem.id)
+        ).all()
+    finally:
+        db.close()
+    return [tuple(r) for r in rows]
+
+
+def test_start_cycle(benchmark, client):
+    quarters = (f"bench-{i}" for i in itertools.count())
+    benchmark.pedantic(lambda: _ok(client.post("/review/start-cycle", params={"quarter": next(quarters)})), rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("stage", stage_actions.STAGES)
+def test_stage_items(benchmark, client, cycle_id, stage):
+    pending = _pending(cycle_id, stage)
+    assert pending, f"no items at {stage}"
+    reviewer_id = pending[0][1]
+    benchmark.extra_info["items"] = sum(1 for _, r in pending if r == reviewer_id)
+    url = f"/review/{STAGE_PATHS[stage]}/items"
+    benchmark(lambda: _ok(client.get(url, params={"user_id": reviewer_id, "cycle_id": cycle_id})))
+
+
+def _table_bytes(db, table: str):
+    # on-disk size from SQLite's dbstat table, where it is compiled in
+    try:
+        return db.execute(text("SELECT sum(pgsize) FROM dbstat WHERE name = :name"), {"name": table}).scalar()
+    except OperationalError:
+        return None
+
+
+def test_scan_items(benchmark, cycle_id):
+    # a full pass over the cycle's hot rows; narrower rows mean fewer pages per scan
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(func.count()).where(models.ReviewItem.cycle_id == cycle_id)).scalar()
+        size = _table_bytes(db, "review_item")
+        if size is not None:
+            benchmark.extra_info["review_item_bytes_per_row"] = round(size / db.execute(select(func.count(models.ReviewItem.id))).scalar(), 1)
+        stmt = (
+            select(models.ReviewItem.pending_stage, models.ReviewItem.final_status, func.count())
+            .where(models.ReviewItem.cycle_id == cycle_id)
+            .group_by(models.ReviewItem.pending_stage, models.ReviewItem.final_status)
+        )
+        benchmark.extra_info["items"] = rows
+        benchmark(lambda: db.execute(stmt).all())
+    finally:
+        db.close()
+
+
+def test_items_page(benchmark, client, cycle_id):
+    benchmark(lambda: _ok(client.get("/review/items", params={"cycle_id": cycle_id, "limit": 1000})))
+
+
+def test_item_detail(benchmark, client, cycle_id):
+    # items with decisions at one or more stages, loaded from stage_decision on demand
+    db = SessionLocal()
+    try:
+        ids = db.execute(
+            select(models.StageDecision.review_item_id).distinct()
+            .join(models.ReviewItem, models.ReviewItem.id == models.StageDecision.review_item_id)
+            .where(models.ReviewItem.cycle_id == cycle_id).limit(1000)
+        ).scalars().all()
+    finally:
+        db.close()
+    items = itertools.cycle(ids)
+    benchmark(lambda: _ok(client.get(f"/review/items/{next(items)}")))
+
+
+def test_inbox(benchmark, client, cycle_id):
+    reviewer_id = _pending(cycle_id, "app_manager")[0][1]
+    benchmark(lambda: _ok(client.get("/review/inbox", params={"user_id": reviewer_id, "cycle_id": cycle_id, "limit": 100})))
+
+
+def _busiest_manager(depth: int) -> int:
+    # the manager `depth` below the top with the largest team
+    closure = models.ReportingClosure
+    db = SessionLocal()
+    try:
+        heads = select(closure.descendant_id).where(closure.ancestor_id == 1, closure.depth == depth)
+        return db.execute(
+            select(closure.ancestor_id).where(closure.ancestor_id.in_(heads))
+            .group_by(closure.ancestor_id).order_by(func.count().desc(), closure.ancestor_id).limit(1)
+        ).scalar()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_subtree_inbox(benchmark, client, cycle_id, depth):
+    manager_id = _busiest_manager(depth)
+    params = {"user_id": manager_id, "cycle_id": cycle_id, "scope": "subtree", "limit": 100}
+    benchmark(lambda: _ok(client.get("/review/inbox", params=params)))
+
+
+@pytest.mark.parametrize("depth", [1, 2])
+def test_rollup(benchmark, client, cycle_id, depth):
+    manager_id = _busiest_manager(depth)
+    benchmark(lambda: _ok(client.get(f"/review/cycles/{cycle_id}/rollup", params={"manager_id": manager_id})))
+
+
+def test_escalation(benchmark, client, cycle_id):
+    items = itertools.cycle([item_id for item_id, _ in _pending(cycle_id, "reporting_manager")[:1000]])
+    benchmark(lambda: _ok(client.get(f"/review/items/{next(items)}/escalation", params={"levels": 2})))
+
+
+@pytest.mark.parametrize("stage", ["reporting_manager", "business_owner"])
+def test_single_action(benchmark, client, cycle_id, stage):
+    pending = iter(_pending(cycle_id, stage))
+    url = f"/review/{STAGE_PATHS[stage]}/action"
+
+    def setup():
+        item_id, reviewer_id = next(pending)
+        return ({"review_item_id": item_id, "actor_user_id": reviewer_id, "action": "approve"},), {}
+
+    benchmark.pedantic(lambda payload: _ok(client.post(url, json=payload)), setup=setup, rounds=SINGLE_ROUNDS, iterations=1)
+
+
+def test_bulk_action(benchmark, client, cycle_id):
+    # one reviewer's items per round, up to BULK_SIZE, busiest app managers first
+    by_reviewer = {}
+    for item_id, reviewer_id in _pending(cycle_id, "app_manager"):
+        by_reviewer.setdefault(reviewer_id, []).append(item_id)
+    batches = iter([(r, ids[:BULK_SIZE]) for r, ids in by_reviewer.items()])
+    sizes = []
+
+    def setup():
+        reviewer_id, ids = next(batches)
+        sizes.append(len(ids))
+        return ({"actor_user_id": reviewer_id, "action": "approve", "review_item_ids": ids},), {}
+
+    def run(payload):
+        result = _ok(client.post("/review/app-manager/actions:batch", json=payload)).json()
+        assert result["failed"] == 0
+
+    benchmark.pedantic(run, setup=setup, rounds=BULK_ROUNDS, iterations=1)
+    benchmark.extra_info["batch_sizes"] = sizes
+
+
+def test_login(benchmark, client):
+    db = SessionLocal()
+    try:
+        ids = db.execute(select(models.User.business_user_id).order_by(models.User.id).limit(1000)).scalars().all()
+    finally:
+        db.close()
+    users = itertools.cycle(ids)
+    benchmark(lambda: _ok(client.post("/auth/login", json={"business_user_id": next(users)})))
+
+
+@pytest.mark.parametrize("url", LIST_ENDPOINTS)
+def test_list(benchmark, client, url):
+    benchmark(lambda: _ok(client.get(url)))
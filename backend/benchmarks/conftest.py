@@ -0,0 +1,93 @@
+import os
+import shutil
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.getenv("BENCH_DIR", os.path.join(HERE, ".data"))
+RESULTS_DIR = os.path.join(HERE, ".results")
+
+_org = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("review benchmarks")
+    group.addoption("--bench-scale", default=os.getenv("BENCH_SCALE", "10k"), help="10k, 100k, 1m or a number of access rows")
+    group.addoption("--bench-seed", type=int, default=int(os.getenv("BENCH_SEED", "42")))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    scale, seed = config.getoption("bench_scale"), config.getoption("bench_seed")
+    # saved JSON lands next to the suite wherever pytest is run from, named by scale so
+    # --benchmark-compare lines up runs of the same org
+    if config.getoption("benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{RESULTS_DIR}"
+    if config.getoption("benchmark_autosave", False) and not config.getoption("benchmark_save", None):
+        config.option.benchmark_save = f"{scale}-seed{seed}"
+
+    # the app binds its engine on import, so the database has to be in place before
+    # any benchmark module imports backend
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    template = os.path.join(BENCH_DIR, f"org-{scale}-{seed}.db")
+    working = os.path.join(BENCH_DIR, f"run-{scale}-{seed}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{working}"
+    # route query budgets fail the benchmark that exceeds them, at every scale
+    os.environ.setdefault("QUERY_BUDGET", "raise")
+
+    from benchmarks.generator import generate, sizes
+    if not os.path.exists(template):
+        generate(f"sqlite:///{template}.part", scale, seed)
+        os.replace(template + ".part", template)
+    # every run starts from the same generated org; the benchmarks write to a copy
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(working + suffix):
+            os.remove(working + suffix)
+    shutil.copyfile(template, working)
+    _org.update(scale=scale, seed=seed, **sizes(scale))
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    output_json["org"] = dict(_org)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def cycle_id(client):
+    # one generated cycle, then a deterministic share of items pushed through each
+    # stage so every stage listing and action has work to do
+    from datetime import datetime
+    from sqlalchemy import and_, insert, literal, select, update
+    from backend.db.database import SessionLocal
+    from backend.db import models
+    from backend.utils import cycle_summary, stage_actions
+
+    response = client.post("/review/start-cycle", params={"quarter": "bench-base"})
+    assert response.status_code == 200, response.text
+    cid = response.json()["cycle_id"]
+
+    item = models.ReviewItem
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for k, stage in enumerate(stage_actions.STAGES[:-1]):
+            advancing = and_(item.cycle_id == cid, item.pending_stage == stage, item.id.op(">>")(k).op("&")(1) == 0)
+            db.execute(insert(models.StageDecision).from_select(
+                ["review_item_id", "stage", "action", "decided_at"],
+                select(item.id, literal(stage), literal("approve"), literal(now)).where(advancing),
+            ))
+            db.execute(
+                update(item).where(advancing).values(stage_actions.advance_values("approve"))
+                .execution_options(synchronize_session=False)
+            )
+        cycle_summary.rebuild(db, cid)
+        db.commit()
+    finally:
+        db.close()
+    return cid
@@ -0,0 +1,141 @@
+import argparse
+import random
+import time
+from collections import deque
+from itertools import accumulate
+from sqlalchemy import create_engine, insert
+from backend.db.database import Base
+from backend.db import models
+from backend.utils import reporting_closure
+
+# scale = number of access rows; users, apps and mappings are sized from it
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+ROLES = ["admin", "reviewer", "auditor", "user"]
+
+ACCESSES_PER_USER = 8
+ACCESSES_PER_APP = 500
+TEAM_APPS = 12
+TEAM_SHARE = 0.7
+INSERT_BATCH = 50_000
+
+
+def sizes(scale) -> dict:
+    n_access = SCALES.get(scale) or int(scale)
+    return {
+        "access": n_access,
+        "users": max(n_access // ACCESSES_PER_USER, 50),
+        "applications": max(n_access // ACCESSES_PER_APP, 20),
+    }
+
+
+def _org_tree(rng: random.Random, n_users: int) -> dict:
+    # breadth-first fill: every user manages the next 4-10 hires, which gives a
+    # depth of log_7(n) and roughly 85% individual contributors
+    manager_of = {}
+    managers = deque([1])
+    next_id = 2
+    while next_id <= n_users:
+        manager = managers.popleft()
+        for _ in range(rng.randint(4, 10)):
+            if next_id > n_users:
+                break
+            manager_of[next_id] = manager
+            managers.append(next_id)
+            next_id += 1
+    return manager_of
+
+
+def build(scale, seed: int = 42) -> dict:
+    # rows per table as lists of dicts, deterministic for (scale, seed)
+    rng = random.Random(seed)
+    n = sizes(scale)
+    n_users, n_apps, n_access = n["users"], n["applications"], n["access"]
+
+    # business_user_id follows the IPAMC (employee) / EXTA (contractor) convention
+    users = [
+        {"id": i, "business_user_id": f"{'EXTA' if rng.random() < 0.1 else 'IPAMC'}{i}", "name": f"User {i}", "email": f"user{i}@example.com"}
+        for i in range(1, n_users + 1)
+    ]
+    applications = [{"id": a, "name": f"app-{a:05d}", "description": None} for a in range(1, n_apps + 1)]
+
+    manager_of = _org_tree(rng, n_users)
+    reports = {}
+    for user_id, manager_id in manager_of.items():
+        reports.setdefault(manager_id, []).append(user_id)
+    people_managers = sorted(reports)
+
+    # app popularity is Zipf-like; each team also has a handful of apps it mostly uses
+    cum_weights = list(accumulate(1 / (rank ** 0.8) for rank in range(1, n_apps + 1)))
+    apps = list(range(1, n_apps + 1))
+    team_apps = {m: rng.choices(apps, cum_weights=cum_weights, k=TEAM_APPS) for m in people_managers}
+    team_apps[None] = rng.choices(apps, cum_weights=cum_weights, k=TEAM_APPS)
+
+    access, seen = [], set()
+    while len(access) < n_access:
+        user_id = rng.randint(1, n_users)
+        if rng.random() < TEAM_SHARE:
+            app_id = rng.choice(team_apps[manager_of.get(user_id)])
+        else:
+            app_id = rng.choices(apps, cum_weights=cum_weights)[0]
+        if (user_id, app_id) in seen:
+            continue
+        seen.add((user_id, app_id))
+        access.append({"id": len(access) + 1, "user_id": user_id, "application_id": app_id, "active": rng.random() < 0.95})
+
+    # a manager reviews the apps their direct reports use, with some gaps
+    reporting_app = sorted({(manager_of[a["user_id"]], a["application_id"]) for a in access if a["user_id"] in manager_of})
+    reporting_app = [{"manager_id": m, "app_id": a} for m, a in reporting_app if rng.random() < 0.9]
+
+    def app_reviewers(share):
+        return [{"app_id": a, "user_id": rng.choice(people_managers)} for a in apps if rng.random() < share]
+
+    user_roles = [{"user_id": u, "role_id": 4} for u in range(1, n_users + 1)]
+    user_roles += [{"user_id": m, "role_id": 2} for m in people_managers]
+    user_roles += [{"user_id": u, "role_id": 1} for u in rng.sample(range(1, n_users + 1), 5)]
+    user_roles += [{"user_id": u, "role_id": 3} for u in rng.sample(range(1, n_users + 1), 5)]
+
+    return {
+        models.User: users,
+        models.Role: [{"id": i, "name": name} for i, name in enumerate(ROLES, 1)],
+        models.UserRole: user_roles,
+        models.Application: applications,
+        models.ReportingMap: [{"manager_id": m, "user_id": u} for u, m in manager_of.items()],
+        models.ReportingAppMap: reporting_app,
+        # some apps have two managers; the resolver takes the first
+        models.AppManagerMap: app_reviewers(1.0) + app_reviewers(0.2),
+        models.AppOwnerMap: app_reviewers(0.95),
+        models.BusinessOwnerMap: app_reviewers(0.85),
+        models.Access: access,
+    }
+
+
+def generate(database_url: str, scale, seed: int = 42) -> dict:
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    counts = {}
+    with engine.begin() as conn:
+        for model, rows in build(scale, seed).items():
+            for i in range(0, len(rows), INSERT_BATCH):
+                conn.execute(insert(model), rows[i:i + INSERT_BATCH])
+            counts[model.__tablename__] = len(rows)
+        counts["reporting_closure"] = reporting_closure.rebuild(conn)
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic org for benchmarking")
+    parser.add_argument("database_url", help="e.g. sqlite:///bench.db (tables are created if missing)")
+    parser.add_argument("--scale", default="10k", help=f"{', '.join(SCALES)} or a number of access rows")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = generate(args.database_url, args.scale, args.seed)
+    for table, n in counts.items():
+        print(f"{table}: {n}")
+    print(f"generated in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, insert, func, case, literal
 from sqlalchemy.orm import Session
 from datetime import datetime
 from backend.db.database import get_db
@@ -6,6 +7,49 @@ from backend.db import models, schemas
 
 router = APIRouter(prefix="/review", tags=["Review & Workflow"])
 
+# first mapping row per key, as one grouped subquery
+def _first_map(model, key_col, value_col):
+    first_ids = select(func.min(model.id)).group_by(key_col)
+    return select(key_col.label("key"), value_col.label("user_id")).where(model.id.in_(first_ids)).subquery()
+
+def _review_item_select(cycle_id: int):
+    rm = _first_map(models.ReportingMap, models.ReportingMap.user_id, models.ReportingMap.manager_id)
+    am = _first_map(models.AppManagerMap, models.AppManagerMap.app_id, models.AppManagerMap.user_id)
+    ao = _first_map(models.AppOwnerMap, models.AppOwnerMap.app_id, models.AppOwnerMap.user_id)
+    bo = _first_map(models.BusinessOwnerMap, models.BusinessOwnerMap.app_id, models.BusinessOwnerMap.user_id)
+
+    pending_stage = case(
+        (rm.c.user_id.isnot(None), "reporting_manager"),
+        (am.c.user_id.isnot(None), "app_manager"),
+        (ao.c.user_id.isnot(None), "app_owner"),
+        (bo.c.user_id.isnot(None), "business_owner"),
+        else_="completed",
+    )
+
+    return (
+        select(
+            literal(cycle_id),
+            models.Access.id,
+            rm.c.user_id,
+            am.c.user_id,
+            ao.c.user_id,
+            bo.c.user_id,
+            pending_stage,
+        )
+        .select_from(models.Access)
+        .outerjoin(rm, rm.c.key == models.Access.user_id)
+        .outerjoin(am, am.c.key == models.Access.application_id)
+        .outerjoin(ao, ao.c.key == models.Access.application_id)
+        .outerjoin(bo, bo.c.key == models.Access.application_id)
+        .where(models.Access.active == True)
+        .order_by(models.Access.id)
+    )
+
+_REVIEW_ITEM_COLUMNS = [
+    "cycle_id", "access_id", "reporting_manager_id", "app_manager_id",
+    "app_owner_id", "business_owner_id", "pending_stage",
+]
+
 @router.post("/start-cycle")
 def start_cycle(quarter: str, db: Session = Depends(get_db)):
     cycle = models.ReviewCycle(quarter=quarter, status="in_progress")
@@ -13,47 +57,8 @@ def start_cycle(quarter: str, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(cycle)
 
-    accesses = db.query(models.Access).filter(models.Access.active == True).all()
-
-    for acc in accesses:
-        # find reporting manager for this user
-        rm_map = db.query(models.ReportingMap).filter(models.ReportingMap.user_id == acc.user_id).first()
-        reporting_manager_id = rm_map.manager_id if rm_map else None
-
-        # app manager
-        am_map = db.query(models.AppManagerMap).filter(models.AppManagerMap.app_id == acc.application_id).first()
-        app_manager_id = am_map.user_id if am_map else None
-
-        # app owner
-        ao_map = db.query(models.AppOwnerMap).filter(models.AppOwnerMap.app_id == acc.application_id).first()
-        app_owner_id = ao_map.user_id if ao_map else None
-
-        # business owner
-        bo_map = db.query(models.BusinessOwnerMap).filter(models.BusinessOwnerMap.app_id == acc.application_id).first()
-        business_owner_id = bo_map.user_id if bo_map else None
-
-        if reporting_manager_id:
-            pending_stage = "reporting_manager"
-        elif app_manager_id:
-            pending_stage = "app_manager"
-        elif app_owner_id:
-            pending_stage = "app_owner"
-        elif business_owner_id:
-            pending_stage = "business_owner"
-        else:
-            pending_stage = "completed"
-
-        item = models.ReviewItem(
-            cycle_id=cycle.id,
-            access_id=acc.id,
-            reporting_manager_id=reporting_manager_id,
-            app_manager_id=app_manager_id,
-            app_owner_id=app_owner_id,
-            business_owner_id=business_owner_id,
-            pending_stage=pending_stage,
-        )
-        db.add(item)
-
+    # resolve every reviewer and insert all items in a single INSERT ... SELECT
+    db.execute(insert(models.ReviewItem).from_select(_REVIEW_ITEM_COLUMNS, _review_item_select(cycle.id)))
     db.commit()
     return {"message": "Review cycle started", "cycle_id": cycle.id}
 
@@ -99,25 +104,19 @@ def bo_items(user_id: int, cycle_id: int, db: Session = Depends(get_db)):
     ).all()
 
 # Stage actions
-def _next_stage_after_rm(item: models.ReviewItem):
-    if item.app_manager_id:
-        return "app_manager"
-    if item.app_owner_id:
-        return "app_owner"
-    if item.business_owner_id:
-        return "business_owner"
-    return "completed"
-
-def _next_stage_after_am(item: models.ReviewItem):
-    if item.app_owner_id:
-        return "app_owner"
-    if item.business_owner_id:
-        return "business_owner"
-    return "completed"
-
-def _next_stage_after_ao(item: models.ReviewItem):
-    if item.business_owner_id:
-        return "business_owner"
+# stages in review order, with the ReviewItem column holding each stage's reviewer
+STAGE_PIPELINE = [
+    ("reporting_manager", "reporting_manager_id"),
+    ("app_manager", "app_manager_id"),
+    ("app_owner", "app_owner_id"),
+    ("business_owner", "business_owner_id"),
+]
+
+def _next_stage(item: models.ReviewItem, stage: str):
+    stages = [s for s, _ in STAGE_PIPELINE]
+    for later, reviewer_attr in STAGE_PIPELINE[stages.index(stage) + 1:]:
+        if getattr(item, reviewer_attr):
+            return later
     return "completed"
 
 @router.post("/reporting-manager/action")
@@ -134,7 +133,7 @@ def reporting_manager_action(payload: schemas.StageActionInput, db: Session = De
     item.manager_comment = payload.comment
     item.manager_timestamp = datetime.utcnow()
 
-    next_stage = _next_stage_after_rm(item)
+    next_stage = _next_stage(item, "reporting_manager")
     if next_stage == "completed":
         item.pending_stage = "completed"
         item.final_status = payload.action
@@ -165,7 +164,7 @@ def app_manager_action(payload: schemas.StageActionInput, db: Session = Depends(
     item.application_manager_comment = payload.comment
     item.application_manager_timestamp = datetime.utcnow()
 
-    next_stage = _next_stage_after_am(item)
+    next_stage = _next_stage(item, "app_manager")
     if next_stage == "completed":
         item.pending_stage = "completed"
         item.final_status = payload.action
@@ -196,7 +195,7 @@ def app_owner_action(payload: schemas.StageActionInput, db: Session = Depends(ge
     item.application_owner_comment = payload.comment
     item.application_owner_timestamp = datetime.utcnow()
 
-    next_stage = _next_stage_after_ao(item)
+    next_stage = _next_stage(item, "app_owner")
     if next_stage == "completed":
         item.pending_stage = "completed"
         item.final_status = payload.action
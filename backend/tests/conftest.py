@@ -0,0 +1,83 @@
+import os
+import tempfile
+from types import SimpleNamespace
+import pytest
+
+DB_DIR = tempfile.mkdtemp(prefix="access-review-tests-")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # the app binds its engine on import, so the database has to be chosen before any
+    # test module imports backend; every run starts from an empty file
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'tests.db')}"
+    os.environ["QUERY_BUDGET"] = "raise"
+    os.environ.setdefault("AUTH_SECRET", "tests-only-secret")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def org(client):
+    # one application reviewed at every stage: four employees report to rm, who reviews
+    # the app, which has a manager, an owner and a business owner
+    from backend.db.database import SessionLocal
+    from backend.db import models
+    from backend.utils import reporting_closure
+
+    db = SessionLocal()
+    try:
+        users = {}
+        for n, key in enumerate(("admin", "auditor", "rm", "am", "ao", "bo", "e1", "e2", "e3", "e4"), 1):
+            users[key] = models.User(business_user_id=f"IPAMC{n}", name=key, email=f"{key}@example.com")
+        db.add_all(users.values())
+        roles = {name: models.Role(name=name) for name in ("admin", "auditor", "reviewer")}
+        db.add_all(roles.values())
+        app = models.Application(name="crm")
+        db.add(app)
+        db.flush()
+        db.add_all([
+            models.UserRole(user_id=users["admin"].id, role_id=roles["admin"].id),
+            models.UserRole(user_id=users["auditor"].id, role_id=roles["auditor"].id),
+            models.ReportingAppMap(manager_id=users["rm"].id, app_id=app.id),
+            models.AppManagerMap(user_id=users["am"].id, app_id=app.id),
+            models.AppOwnerMap(user_id=users["ao"].id, app_id=app.id),
+            models.BusinessOwnerMap(user_id=users["bo"].id, app_id=app.id),
+        ])
+        for key in ("e1", "e2", "e3", "e4"):
+            db.add(models.ReportingMap(manager_id=users["rm"].id, user_id=users[key].id))
+            db.add(models.Access(user_id=users[key].id, application_id=app.id))
+        db.flush()
+        reporting_closure.rebuild(db)
+        db.commit()
+        return SimpleNamespace(
+            app_id=app.id,
+            role_ids={name: role.id for name, role in roles.items()},
+            business_ids={key: user.business_user_id for key, user in users.items()},
+            **{key: user.id for key, user in users.items()},
+        )
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def cycle_id(client, org):
+    # a fresh cycle per test, so each one starts with every item at reporting_manager
+    response = client.post("/review/start-cycle", params={"quarter": "tests"})
+    assert response.status_code == 200, response.text
+    return response.json()["cycle_id"]
+
+
+@pytest.fixture
+def login(client, org):
+    def headers(key: str) -> dict:
+        response = client.post("/auth/login", json={"business_user_id": org.business_ids[key]})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['token']}"}
+    return headers
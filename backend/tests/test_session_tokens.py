@@ -0,0 +1,125 @@
+import base64
+import json
+import time
+import pytest
+from backend.config import settings
+from backend.utils import session_tokens
+
+
+def _items(cycle_id):
+    return f"/review/items?cycle_id={cycle_id}"
+
+
+def _inbox(user_id, cycle_id):
+    return f"/review/inbox?user_id={user_id}&cycle_id={cycle_id}"
+
+
+def _with_claims(token: str, **changes) -> str:
+    # the same header and signature over a different payload
+    header, payload, signature = token.split(".")
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    claims.update(changes)
+    forged = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=").decode()
+    return f"{header}.{forged}.{signature}"
+
+
+def _bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_round_trip():
+    token, _ = session_tokens.issue(7, ["reviewer"], {"app_owner": [3]})
+    principal = session_tokens.Principal(session_tokens.decode(token))
+    assert (principal.user_id, principal.roles) == (7, frozenset({"reviewer"}))
+    assert principal.reviews("app_owner", 3) and not principal.reviews("app_owner", 4)
+    assert not principal.reviews("business_owner")
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: _with_claims(token, roles=["admin"]),
+    lambda token: token[:-2] + ("AA" if token[-2:] != "AA" else "BB"),
+])
+def test_tampered_token_is_rejected(client, login, cycle_id, tamper):
+    token = login("rm")["Authorization"].split()[1]
+    with pytest.raises(session_tokens.TokenError, match="signature"):
+        session_tokens.decode(tamper(token))
+    response = client.get(_items(cycle_id), headers=_bearer(tamper(token)))
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_other_algorithms_are_rejected(client, login, cycle_id):
+    token = login("admin")["Authorization"].split()[1]
+    none_header = base64.urlsafe_b64encode(b'{"alg":"none","typ":"JWT"}').rstrip(b"=").decode()
+    _, payload, _ = token.split(".")
+    response = client.get(_items(cycle_id), headers=_bearer(f"{none_header}.{payload}."))
+    assert (response.status_code, response.json()["detail"]) == (401, "Malformed token")
+
+
+def test_expired_token_is_rejected(client, org, cycle_id, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TOKEN_TTL_SECONDS", 0)
+    token, _ = session_tokens.issue(org.admin, ["admin"], {})
+    with pytest.raises(session_tokens.TokenError, match="expired"):
+        session_tokens.decode(token)
+    response = client.get(_items(cycle_id), headers=_bearer(token))
+    assert (response.status_code, response.json()["detail"]) == (401, "Token expired")
+
+
+def test_role_change_revokes_earlier_tokens(client, org, login, cycle_id):
+    headers = login("am")
+    assert client.get(_inbox(org.am, cycle_id), headers=headers).status_code == 200
+
+    response = client.post("/user-roles/assign", json={"user_id": org.am, "role_id": org.role_ids["reviewer"]})
+    assert response.status_code == 200, response.text
+    response = client.get(_inbox(org.am, cycle_id), headers=headers)
+    assert (response.status_code, response.json()["detail"]) == (401, "Token revoked, log in again")
+
+    # iat has millisecond resolution: a token from the same millisecond as the revocation
+    # counts as issued before it
+    time.sleep(0.002)
+    headers = login("am")
+    assert client.get(_inbox(org.am, cycle_id), headers=headers).status_code == 200
+
+
+def test_missing_token(client, org, cycle_id, monkeypatch):
+    assert client.get(_inbox(org.rm, cycle_id)).status_code == 200
+    monkeypatch.setattr(settings, "AUTH_REQUIRED", True)
+    response = client.get(_inbox(org.rm, cycle_id))
+    assert (response.status_code, response.json()["detail"]) == (401, "Not authenticated")
+
+
+def test_reader_checks(client, org, login, cycle_id):
+    assert client.get(_inbox(org.rm, cycle_id), headers=login("rm")).status_code == 200
+    response = client.get(_inbox(org.rm, cycle_id), headers=login("ao"))
+    assert (response.status_code, response.json()["detail"]) == (403, "Cannot read another reviewer's items")
+    assert client.get(_items(cycle_id), headers=login("rm")).status_code == 403
+    for key in ("admin", "auditor"):
+        assert client.get(_inbox(org.rm, cycle_id), headers=login(key)).status_code == 200
+        assert client.get(_items(cycle_id), headers=login(key)).status_code == 200
+
+
+def test_actor_checks(client, org, login, cycle_id):
+    item_id = client.get(_items(cycle_id)).json()[0]["id"]
+    action = {"review_item_id": item_id, "action": "approve"}
+
+    response = client.post("/review/reporting-manager/action", json={**action, "actor_user_id": org.rm}, headers=login("am"))
+    assert (response.status_code, response.json()["detail"]) == (403, "actor_user_id does not match the session")
+    # admins act as themselves too
+    response = client.post("/review/reporting-manager/action", json={**action, "actor_user_id": org.rm}, headers=login("admin"))
+    assert response.status_code == 403
+    response = client.post("/review/reporting-manager/action", json={**action, "actor_user_id": org.am}, headers=login("am"))
+    assert (response.status_code, response.json()["detail"]) == (403, "Not a Reporting Manager reviewer")
+
+    response = client.post("/review/reporting-manager/action", json={**action, "actor_user_id": org.rm}, headers=login("rm"))
+    assert response.status_code == 200, response.text
+
+
+def test_admin_checks(client, org, login, cycle_id):
+    for key in ("rm", "auditor"):
+        headers = login(key)
+        assert client.post("/review/start-cycle", params={"quarter": "tests"}, headers=headers).status_code == 403
+        response = client.post(f"/review/cycles/{cycle_id}/apply", json={"actor_user_id": getattr(org, key), "dry_run": True}, headers=headers)
+        assert (response.status_code, response.json()["detail"]) == (403, "Admin role required")
+    headers = login("admin")
+    assert client.post("/review/start-cycle", params={"quarter": "tests"}, headers=headers).status_code == 200
+    assert client.post(f"/review/cycles/{cycle_id}/apply", json={"actor_user_id": org.admin, "dry_run": True}, headers=headers).status_code == 200
@@ -0,0 +1,117 @@
+import threading
+from sqlalchemy import func, select
+from backend.db.database import SessionLocal
+from backend.db import models
+from backend.utils import stage_actions
+
+
+def _item_ids(cycle_id) -> list:
+    with SessionLocal() as db:
+        return db.execute(select(models.ReviewItem.id).where(models.ReviewItem.cycle_id == cycle_id).order_by(models.ReviewItem.id)).scalars().all()
+
+
+def _item(item_id):
+    with SessionLocal() as db:
+        return db.execute(select(models.ReviewItem.pending_stage, models.ReviewItem.version).where(models.ReviewItem.id == item_id)).one()
+
+
+def _history(item_id) -> int:
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).where(models.ApprovalHistory.review_item_id == item_id)).scalar()
+
+
+def _act(client, path, item_id, actor_user_id, **extra):
+    return client.post(f"/review/{path}/action", json={"review_item_id": item_id, "actor_user_id": actor_user_id, "action": "approve", **extra})
+
+
+def _race(calls) -> list:
+    # each call runs on its own session and thread, all released at once
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+
+    def run(n, kwargs):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            results[n] = stage_actions.apply_stage_action(db, **kwargs)
+            db.commit()
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=run, args=(n, kwargs)) for n, kwargs in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_action_moves_item_and_bumps_version(client, org, cycle_id):
+    item_id = _item_ids(cycle_id)[0]
+    assert _item(item_id) == ("reporting_manager", 0)
+    response = _act(client, "reporting-manager", item_id, org.rm, expected_version=0)
+    assert response.status_code == 200, response.text
+    assert _item(item_id) == ("app_manager", 1)
+
+
+def test_failure_mapping(client, org, cycle_id):
+    first, second = _item_ids(cycle_id)[:2]
+    assert _act(client, "reporting-manager", first, org.rm).status_code == 200
+
+    response = _act(client, "app-manager", first, org.am, expected_version=0)
+    assert (response.status_code, response.json()["detail"]) == (409, "Item has changed (version 1), reload it")
+    response = _act(client, "reporting-manager", first, org.rm)
+    assert (response.status_code, response.json()["detail"]) == (400, "Item is not at Reporting Manager stage")
+    response = _act(client, "reporting-manager", second, org.am)
+    assert (response.status_code, response.json()["detail"]) == (403, "Not authorized for this item")
+    response = _act(client, "reporting-manager", max(_item_ids(cycle_id)) + 1000, org.rm)
+    assert (response.status_code, response.json()["detail"]) == (404, "Review item not found")
+
+    # nothing above was written
+    assert _item(first) == ("app_manager", 1) and _item(second) == ("reporting_manager", 0)
+    assert _history(first) == 1 and _history(second) == 0
+
+
+def test_batch_partial_failure(client, org, cycle_id):
+    moved, *pending = _item_ids(cycle_id)
+    assert _act(client, "reporting-manager", moved, org.rm).status_code == 200
+    missing = max(pending) + 1000
+
+    response = client.post("/review/reporting-manager/actions:batch", json={
+        "actor_user_id": org.rm, "action": "approve", "review_item_ids": [moved, *pending, missing],
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["processed"], body["failed"]) == (len(pending), 2)
+    statuses = {r["review_item_id"]: r["status"] for r in body["results"]}
+    assert statuses == {moved: "wrong_stage", **{i: "ok" for i in pending}, missing: "not_found"}
+    # the failures did not hold back the rest
+    assert all(_item(i) == ("app_manager", 1) for i in pending)
+    assert _item(moved) == ("app_manager", 1) and _history(moved) == 1
+
+
+def test_racing_actions_on_one_item(org, cycle_id):
+    item_id = _item_ids(cycle_id)[0]
+    call = {"stage": "reporting_manager", "actor_user_id": org.rm, "action": "approve", "item_ids": [item_id], "expected_version": 0}
+    results = _race([call, call])
+
+    statuses = sorted(r["status"] for [r] in results)
+    assert statuses == ["conflict", "ok"]
+    assert _item(item_id) == ("app_manager", 1)
+    assert _history(item_id) == 1
+
+
+def test_racing_batches_move_each_item_once(org, cycle_id):
+    item_ids = _item_ids(cycle_id)
+    call = {"stage": "reporting_manager", "actor_user_id": org.rm, "action": "approve", "cycle_id": cycle_id}
+    results = _race([call, call])
+
+    moved = [r["review_item_id"] for batch in results for r in batch if r["status"] == "ok"]
+    assert sorted(moved) == item_ids
+    assert all(_history(i) == 1 for i in item_ids)
+    with SessionLocal() as db:
+        summary = models.CycleStageSummary
+        counts = dict(db.execute(
+            select(summary.stage, func.sum(summary.item_count)).where(summary.cycle_id == cycle_id).group_by(summary.stage)
+        ).all())
+    assert (counts.get("reporting_manager", 0), counts["app_manager"]) == (0, len(item_ids))